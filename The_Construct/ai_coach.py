@@ -1,25 +1,25 @@
 import json
 import os
-import time
-import cv2
-import sys # <--- REQUIRED for app connection
-
-try:
-    import pyttsx3
-    engine = pyttsx3.init()
-    engine.setProperty('rate', 175) 
-    HAS_VOICE = True
-except ImportError:
-    HAS_VOICE = False
+import sqlite3
+import argparse
+from collections import Counter
+import config
+import session_store
+import storage
+from scoring import JOINT_NAMES
+from session_result import SessionResult
+import speech
+
+# cv2 is imported by the tape replay only, so batch reports run headless.
 
 # --- CONFIGURATION ---
-LOG_PATH = 'stuck_coordinates_log.json'
+LOG_PATH = 'stuck_coordinates_log.json' # Legacy default when no session log is given
+DEFAULT_VIDEO_PATH = 'Raw_video/punches_c.mp4'
 
-# Receive the video path from app.py arguments
-if len(sys.argv) > 1:
-    REFERENCE_VIDEO_PATH = sys.argv[1]
-else:
-    REFERENCE_VIDEO_PATH = 'Raw_video/punches_c.mp4' # Default fallback if run alone
+# How far a joint must be off before it gets a direction cue, per error-log unit
+# (image = fraction of the frame, world = metres, torso = torso lengths)
+CUE_THRESHOLDS = {"image": 0.08, "world": 0.08, "torso": 0.25}
+TIMING_TOLERANCE_MS = 150  # Phase timing offsets smaller than this aren't worth a cue
 
 # --- TERMINAL COLORS ---
 class Colors:
@@ -31,34 +31,23 @@ class Colors:
     ENDC = '\033[0m'
     BOLD = '\033[1m'
 
-JOINT_NAMES = {
-    0: 'nose', 7: 'left ear', 8: 'right ear',
-    11: 'left shoulder', 12: 'right shoulder',
-    13: 'left elbow', 14: 'right elbow',
-    15: 'left wrist', 16: 'right wrist',
-    17: 'left pinky', 18: 'right pinky',
-    19: 'left index finger', 20: 'right index finger',
-    21: 'left thumb', 22: 'right thumb',
-    23: 'left hip', 24: 'right hip',
-    25: 'left knee', 26: 'right knee',
-    27: 'left ankle', 28: 'right ankle',
-    29: 'left heel', 30: 'right heel',
-    31: 'left toe', 32: 'right toe'
-}
-
-def translate_to_gym_slang(joint_name, y_diff, x_diff):
-    """Converts robotic joint names into actual coaching cues."""
+def describe_direction(y_diff, x_diff, threshold=0.08):
+    """'too low and drifting left', or 'out of alignment' when neither axis is clearly off."""
     advice = []
     
     # Y-Axis Logic (0 is ceiling, 1 is floor)
-    if y_diff > 0.08: advice.append("too low")
-    elif y_diff < -0.08: advice.append("too high")
+    if y_diff > threshold: advice.append("too low")
+    elif y_diff < -threshold: advice.append("too high")
         
     # X-Axis Logic (0 is left, 1 is right)
-    if x_diff > 0.08: advice.append("drifting right")
-    elif x_diff < -0.08: advice.append("drifting left")
+    if x_diff > threshold: advice.append("drifting right")
+    elif x_diff < -threshold: advice.append("drifting left")
         
-    action_text = " and ".join(advice) if advice else "out of alignment"
+    return " and ".join(advice) if advice else "out of alignment"
+
+def translate_to_gym_slang(joint_name, y_diff, x_diff, threshold=0.08):
+    """Converts robotic joint names into actual coaching cues."""
+    action_text = describe_direction(y_diff, x_diff, threshold)
 
     if any(x in joint_name for x in ['ear', 'nose']):
         return f"Head/Neck", f"Your head was {action_text}. Keep your spine neutral!"
@@ -73,19 +62,117 @@ def translate_to_gym_slang(joint_name, y_diff, x_diff):
     else:
         return joint_name.title(), f"Your {joint_name} was {action_text}."
 
+def live_cue(correction):
+    """Short spoken cue for a tracker "correction" event ("Left elbow too low."),
+    or None when the joint is within the cue threshold."""
+    threshold = CUE_THRESHOLDS.get(correction.get('units', 'image'), 0.08)
+    if correction['error'] < threshold: return None
+    joint_name = JOINT_NAMES.get(correction['joint_id'], f"joint {correction['joint_id']}")
+    return f"{joint_name.capitalize()} {describe_direction(correction['dy'], correction['dx'], threshold)}."
+
+def cue_templates():
+    """Every cue translate_to_gym_slang and live_cue can produce, one per joint
+    and direction (for pre-rendering to audio with cue_audio.py)."""
+    for joint_id, joint_name in JOINT_NAMES.items():
+        for y_diff in (-1, 0, 1):
+            for x_diff in (-1, 0, 1):
+                yield translate_to_gym_slang(joint_name, y_diff, x_diff, threshold=0.5)[1]
+                yield live_cue({"joint_id": joint_id, "dy": y_diff, "dx": x_diff, "error": 1, "units": "torso"})
+
+def describe_mistake(m):
+    """Cue for one error-log entry: the worst joint, plus the other body
+    groups from 'top_joints' that were clearly off at the same moment."""
+    threshold = CUE_THRESHOLDS.get(m.get('units', 'image'), 0.08)
+    raw_joint = JOINT_NAMES.get(m['failed_joint_id'], f"joint {m['failed_joint_id']}")
+    y_diff = m['wrong_y'] - m['right_y']
+    x_diff = m['wrong_x'] - m['right_x']
+    body_part, coach_cue = translate_to_gym_slang(raw_joint, y_diff, x_diff, threshold)
+
+    seen_groups = {m.get('failed_group')}
+    extras = []
+    for j in m.get('top_joints', []):
+        if j['group'] in seen_groups or j['error'] < threshold: continue
+        seen_groups.add(j['group'])
+        name = JOINT_NAMES.get(j['joint_id'], f"joint {j['joint_id']}")
+        extras.append(translate_to_gym_slang(name, j['dy'], j['dx'], threshold)[1])
+    if extras:
+        coach_cue += " Also: " + " ".join(extras)
+    return body_part, coach_cue
+
+def describe_trend(log_path):
+    """One-line read of the session's score curve from its telemetry file, or None."""
+    from telemetry import telemetry_path, load_telemetry, summarize
+    try:
+        summary = summarize(*load_telemetry(telemetry_path(log_path)))
+    except Exception:
+        return None
+    if not summary: return None
+    first, last = summary["segments"][0], summary["segments"][-1]
+    if last < first - 10: shape = f"You faded from {first:.0f}% to {last:.0f}% as the set went on."
+    elif last > first + 10: shape = f"You warmed up from {first:.0f}% to {last:.0f}%."
+    else: shape = f"You held around {sum(summary['segments']) / len(summary['segments']):.0f}% the whole set."
+    weakest = summary["weakest_group"]
+    if weakest: shape += f" Weakest area: {weakest.replace('_', ' ')}."
+    return shape
+
+def label_phases(mistakes, tape_path):
+    """Fills in 'phase'/'phase_frames' for log entries recorded before the tracker
+    labelled them, using the tape's cached phase index."""
+    if isinstance(tape_path, list): tape_path = tape_path[0]  # Fused sessions: primary angle
+    if not tape_path or not os.path.exists(tape_path) or all('phase' in m for m in mistakes):
+        return
+    from visualizer import get_phase_index
+    try:
+        index = get_phase_index(tape_path)
+    except Exception as e:
+        print(f"[COACH] No phase index for {tape_path}: {e}")
+        return
+    for m in mistakes:
+        if 'phase' in m: continue
+        phase = index.phase_at(m['frame_index'])
+        if phase:
+            m['phase'] = phase['action']
+            m['phase_frames'] = [phase['start_frame'], phase['end_frame']]
+
+def describe_timing(phases, limit=3):
+    """Cues for the trainee's phases that started clearly early or late against the tape."""
+    timed = [p for p in phases if p.get('offset_ms') is not None and abs(p['offset_ms']) >= TIMING_TOLERANCE_MS]
+    timed.sort(key=lambda p: -abs(p['offset_ms']))
+    cues = []
+    for p in timed[:limit]:
+        when = "late" if p['offset_ms'] > 0 else "early"
+        action = p['action'].replace("the ", "")
+        cues.append(f"Your {action} came {abs(p['offset_ms'])} ms {when}.")
+    return cues
+
 def coach_speak(text):
-    if HAS_VOICE:
-        clean_text = text.replace('💪', '').replace('🏋️', '').replace('👊', '').replace('📋', '').replace('▶', '').replace('📺', '')
-        engine.say(clean_text)
-        engine.runAndWait()
-
-def show_video_at_frame(frame_index):
-    if not os.path.exists(REFERENCE_VIDEO_PATH):
-        print(f"  {Colors.FAIL}Couldn't find '{REFERENCE_VIDEO_PATH}'. Skipping.{Colors.ENDC}")
+    # Shared speech worker: fixed cue sentences play from the pre-rendered audio cache
+    clean_text = text.replace('💪', '').replace('🏋️', '').replace('👊', '').replace('📋', '').replace('▶', '').replace('📺', '')
+    speech.get_worker().say(clean_text).wait()
+
+def reference_video(tape_path):
+    """Raw_video/<move>.mp4 for the session's sck/<move>_coords.json (primary angle when fused)."""
+    if isinstance(tape_path, list): tape_path = tape_path[0]
+    if tape_path:
+        stem = os.path.basename(tape_path).replace("_coords.json", "")
+        for ext in (".mp4", ".avi"):
+            path = os.path.join(config.VIDEO_FOLDER, stem + ext)
+            if os.path.exists(path): return path
+    return DEFAULT_VIDEO_PATH
+
+def show_video_at_frame(frame_index, phase_frames=None, video_path=DEFAULT_VIDEO_PATH):
+    """Replays the reference around frame_index: the whole phase it falls in when
+    known, else 45 frames either side."""
+    if not os.path.exists(video_path):
+        print(f"  {Colors.FAIL}Couldn't find '{video_path}'. Skipping.{Colors.ENDC}")
         return
 
-    cap = cv2.VideoCapture(REFERENCE_VIDEO_PATH)
-    start_frame = max(0, frame_index - 45)
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    if phase_frames:
+        start_frame, end_frame = max(0, phase_frames[0] - 15), phase_frames[1] + 15
+    else:
+        start_frame, end_frame = max(0, frame_index - 45), frame_index + 45
     cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
     
     print(f"  {Colors.GREEN}Loading tape... (Press 'q' to close){Colors.ENDC}")
@@ -101,60 +188,208 @@ def show_video_at_frame(frame_index):
             cv2.rectangle(frame, (0, 0), (frame.shape[1], frame.shape[0]), (0, 0, 255), 5)
             
         cv2.imshow('AI Coach Replay', frame)
-        if current_frame > frame_index + 45: break
+        if current_frame > end_frame: break
         if cv2.waitKey(30) & 0xFF == ord('q'): break
 
     cap.release()
     cv2.destroyAllWindows()
 
-def generate_report():
-    if not os.path.exists(LOG_PATH):
+# --- REPORT ---
+def format_mistakes(result):
+    """The session's error log as coaching cues. Keeps the tracker's keys, so an
+    analysis file reads like a session log (session_store._mistake_row)."""
+    label_phases(result.mistakes, result.tape_path)
+    formatted = []
+    for m in result.mistakes:
+        body_part, coach_cue = describe_mistake(m)
+        if m.get('phase'): coach_cue = f"While {m['phase']}: {coach_cue}"
+        formatted.append({
+            'timestamp': m['timestamp'], 'frame_index': m['frame_index'], 'score_at_fail': m['score_at_fail'],
+            'failed_joint_id': m.get('failed_joint_id'), 'failed_group': m.get('failed_group'),
+            'body_part': body_part, 'cue': coach_cue,
+            'phase': m.get('phase'), 'phase_frames': m.get('phase_frames')
+        })
+    return formatted
+
+def dedupe_cues(formatted):
+    """One entry per distinct cue, in order of first appearance, with how often it came up."""
+    cues = {}
+    for m in formatted:
+        if m['cue'] in cues:
+            cues[m['cue']]['count'] += 1
+        else:
+            cues[m['cue']] = {'cue': m['cue'], 'body_part': m['body_part'], 'count': 1,
+                              'first_timestamp': m['timestamp'], 'frame_index': m['frame_index'],
+                              'phase_frames': m['phase_frames']}
+    return list(cues.values())
+
+def build_report(log_path):
+    """Everything the coach has to say about one session log, as plain data (no prompts, no speech)."""
+    result = SessionResult.load(log_path)
+    if result.alias is None or result.move_name is None:
+        # Logs written before run_training_session tagged them: the session store knows
+        try:
+            session = session_store.get_session_by_log(log_path) or {}
+        except sqlite3.Error:
+            session = {}
+        result.alias = result.alias or session.get('alias')
+        result.move_name = result.move_name or session.get('move_name')
+    formatted = format_mistakes(result)
+    fail_scores = [m['score_at_fail'] for m in formatted]
+    return {
+        'log_path': log_path,
+        'session_id': result.session_id,
+        'alias': result.alias,
+        'move_name': result.move_name,
+        'tape_path': result.tape_path,
+        'stats': {
+            'mistakes': len(formatted),
+            'unique_cues': len({m['cue'] for m in formatted}),
+            'avg_accuracy': result.avg_accuracy,
+            'xp_gained': result.xp_gained,
+            'frames_tracked': result.stats.get('frames_tracked'),
+            'avg_score_at_fail': round(sum(fail_scores) / len(fail_scores), 1) if fail_scores else None,
+            'groups': dict(Counter(m['failed_group'] for m in formatted if m['failed_group']).most_common())
+        },
+        'trend': describe_trend(log_path),
+        'timing_cues': describe_timing(result.phases),
+        'cues': dedupe_cues(formatted),
+        'mistakes': formatted
+    }
+
+def analysis_path_for(log_path):
+    """log_X.json -> log_X_analysis.json (what game_logic attaches to the session)."""
+    return log_path.replace(".json", "_analysis.json")
+
+def write_analysis(report):
+    return storage.write_json(analysis_path_for(report['log_path']), report, indent=2)
+
+# --- BATCH ---
+def find_logs(paths):
+    """Session logs named by paths: files as given, folders scanned for log_*.json."""
+    logs = []
+    for path in paths:
+        if os.path.isdir(path):
+            logs += [os.path.join(path, n) for n in sorted(os.listdir(path))
+                     if n.startswith("log_") and n.endswith(".json") and not n.endswith("_analysis.json")]
+        else:
+            logs.append(path)
+    return logs
+
+def summarize_reports(reports):
+    """Class-level numbers across many session reports: totals, the most common cues,
+    and per-trainee averages."""
+    cue_counts, group_counts = Counter(), Counter()
+    trainees = {}
+    for r in reports:
+        for c in r['cues']: cue_counts[c['cue']] += c['count']
+        group_counts.update(r['stats']['groups'])
+        t = trainees.setdefault(r['alias'] or "unknown", {'sessions': 0, 'mistakes': 0, 'accuracy': 0.0})
+        t['sessions'] += 1
+        t['mistakes'] += r['stats']['mistakes']
+        t['accuracy'] += r['stats']['avg_accuracy'] or 0
+    for t in trainees.values():
+        t['avg_accuracy'] = round(t.pop('accuracy') / t['sessions'], 1)
+    total = sum(r['stats']['mistakes'] for r in reports)
+    return {
+        'sessions': len(reports),
+        'mistakes': total,
+        'mistakes_per_session': round(total / len(reports), 2) if reports else 0,
+        'avg_accuracy': round(sum(r['stats']['avg_accuracy'] or 0 for r in reports) / len(reports), 1) if reports else 0,
+        'top_cues': [{'cue': c, 'count': n} for c, n in cue_counts.most_common(10)],
+        'groups': dict(group_counts.most_common()),
+        'trainees': trainees
+    }
+
+def batch_report(paths, write=True):
+    """
+    Builds reports for every session log under paths in one pass, with no
+    prompts or speech. With write, each log also gets its _analysis.json.
+    Returns {"summary", "sessions", "failed"}.
+    """
+    reports, failed = [], []
+    for log_path in find_logs(paths):
+        try:
+            report = build_report(log_path)
+        except Exception as e:
+            failed.append({'log_path': log_path, 'error': str(e)})
+            continue
+        if write: write_analysis(report)
+        reports.append(report)
+    return {'summary': summarize_reports(reports), 'sessions': reports, 'failed': failed}
+
+def print_summary(summary, failed=()):
+    print(f"\n{Colors.HEADER}{Colors.BOLD}=== CLASS REVIEW: {summary['sessions']} SESSIONS ==={Colors.ENDC}")
+    print(f"Mistakes: {summary['mistakes']} ({summary['mistakes_per_session']} per session) | "
+          f"Avg accuracy: {summary['avg_accuracy']}%")
+    print(f"\n{Colors.BOLD}Most common cues{Colors.ENDC}")
+    for c in summary['top_cues']:
+        print(f"  {c['count']:>4}x  {c['cue']}")
+    print(f"\n{Colors.BOLD}Trainees{Colors.ENDC}")
+    for alias, t in sorted(summary['trainees'].items(), key=lambda kv: kv[1]['avg_accuracy']):
+        print(f"  {alias:<20} {t['sessions']:>3} sessions  {t['avg_accuracy']:>5}%  {t['mistakes']:>4} mistakes")
+    for f in failed:
+        print(f"{Colors.FAIL}Skipped {f['log_path']}: {f['error']}{Colors.ENDC}")
+
+# --- INTERACTIVE REVIEW ---
+def generate_report(log_path=LOG_PATH):
+    if not os.path.exists(log_path):
         print(f"{Colors.GREEN}No log found. Clean set!{Colors.ENDC}")
         return
 
-    with open(LOG_PATH, 'r') as f:
-        mistakes = json.load(f)
+    report = build_report(log_path)
+    write_analysis(report)  # game_logic attaches it to the session
 
-    if not mistakes:
+    if not report['mistakes']:
          msg = "Log is empty. Flawless set, bro! 💪"
          print(f"{Colors.GREEN}{Colors.BOLD}{msg}{Colors.ENDC}")
          coach_speak(msg)
          return
 
     print(f"\n{Colors.HEADER}{Colors.BOLD}=== 🏋️  AI COACH TAPE REVIEW ==={Colors.ENDC}")
-    intro_msg = f"I caught {len(mistakes)} form errors."
+    intro_msg = f"I caught {len(report['mistakes'])} form errors."
     print(intro_msg)
     coach_speak(intro_msg)
 
-    # Summary Loop
-    formatted_mistakes = []
-    for m in mistakes:
-        raw_joint = JOINT_NAMES.get(m['failed_joint_id'], f"joint {m['failed_joint_id']}")
-        y_diff = m['wrong_y'] - m['right_y']
-        x_diff = m['wrong_x'] - m['right_x']
-        body_part, coach_cue = translate_to_gym_slang(raw_joint, y_diff, x_diff)
-        
-        formatted_mistakes.append({
-            'time': m['timestamp'], 'match': m['score_at_fail'],
-            'cue': coach_cue, 'frame_index': m['frame_index']
-        })
+    if report['trend']:
+        print(report['trend'])
+        coach_speak(report['trend'])
+
+    for cue in report['timing_cues']:
+        print(f"{Colors.WARNING}⏱ {cue}{Colors.ENDC}")
+        coach_speak(cue)
 
     # Interactive Breakdown
+    video_path = reference_video(report['tape_path'])
     response = input(f"{Colors.BLUE}Review the tape? (y/n): {Colors.ENDC}").strip().lower()
     if response == 'y':
-        last_cue = ""
-        for m in formatted_mistakes:
-            if m['cue'] == last_cue: continue
-            
-            print(f"{Colors.FAIL}▶ {m['time']} (Match: {m['match']}%){Colors.ENDC}")
-            print(f"  {m['cue']}")
-            coach_speak(m['cue'])
+        by_cue = {m['cue']: m for m in reversed(report['mistakes'])}  # First mistake per cue
+        for c in report['cues']:
+            m = by_cue[c['cue']]
+            repeats = f" x{c['count']}" if c['count'] > 1 else ""
+            print(f"{Colors.FAIL}▶ {m['timestamp']} (Match: {m['score_at_fail']}%){repeats}{Colors.ENDC}")
+            print(f"  {c['cue']}")
+            coach_speak(c['cue'])
             
             vid_response = input(f"  {Colors.BLUE}📺 See target video? (y/n): {Colors.ENDC}").strip().lower()
             if vid_response == 'y':
-                show_video_at_frame(m['frame_index'])
+                show_video_at_frame(m['frame_index'], m['phase_frames'], video_path)
             print("")
-            last_cue = m['cue']
 
 if __name__ == "__main__":
-    generate_report()
+    parser = argparse.ArgumentParser(description="AI coach tape review")
+    parser.add_argument("logs", nargs="*", help="Session log(s); folders are scanned for log_*.json")
+    parser.add_argument("--batch", action="store_true", help="Headless report for every log: no prompts, no speech")
+    parser.add_argument("--out", help="Write the batch report (summary + every session) to this JSON file")
+    parser.add_argument("--no-write", action="store_true", help="Don't write per-session _analysis.json files")
+    args = parser.parse_args()
+
+    if args.batch:
+        batch = batch_report(args.logs or [config.MISTAKES_FOLDER], write=not args.no_write)
+        print_summary(batch['summary'], batch['failed'])
+        if args.out:
+            with open(args.out, 'w') as f:
+                json.dump(batch, f, indent=2)
+            print(f"[COACH] Report written to {args.out}")
+    else:
+        generate_report(args.logs[0] if args.logs else LOG_PATH)
@@ -1,11 +1,12 @@
 import customtkinter as ctk
-import subprocess
 import json
 import os
-import sys
 import cv2
 from PIL import Image, ImageTk
-from datetime import datetime
+import session_store
+import profile_store
+import game_logic
+from session_result import session_log_path
 
 # --- CONFIGURATION ---
 ctk.set_appearance_mode("dark")
@@ -22,7 +23,6 @@ MISTAKES_FOLDER = os.path.join(BASE_DIR, "mistakes")
 
 # Files
 PROFILE_FILE = os.path.join(BASE_DIR, "operator_profile.json")
-SESSION_STATS_PATH = os.path.join(BASE_DIR, "session_stats.json")
 
 # Scripts
 LIVE_SCRIPT = os.path.join(BASE_DIR, "live.py")
@@ -137,15 +137,11 @@ class MorpheusTerminal(ctk.CTk):
         alias = self.alias_entry.get().strip() or "Trainee"
         profile = {"alias": alias, "xp": 0, "level": 1}
         
-        if os.path.exists(PROFILE_FILE):
-            try:
-                with open(PROFILE_FILE, 'r') as f:
-                    data = json.load(f)
-                    if data.get("alias") == alias: 
-                        profile.update(data)
-            except: pass
-        
-        with open(PROFILE_FILE, "w") as f: json.dump(profile, f)
+        stored = profile_store.get_store().load(alias)
+        if stored:
+            profile.update(stored)
+        else:
+            profile_store.get_store().save(profile)
         self.show_home_screen(profile)
 
     # --- 2. DASHBOARD ---
@@ -183,16 +179,8 @@ class MorpheusTerminal(ctk.CTk):
         scroll = ctk.CTkScrollableFrame(frame, fg_color="transparent")
         scroll.pack(fill="both", expand=True, padx=40, pady=20)
 
-        if not os.path.exists(VIDEO_FOLDER): os.makedirs(VIDEO_FOLDER)
-        files = [f for f in os.listdir(VIDEO_FOLDER) if f.lower().endswith(('.mp4', '.avi'))]
-        moves = {}
-        for f in files:
-            name_parts = os.path.splitext(f)[0].split('_')
-            base = "_".join(name_parts[:-1]).upper() if len(name_parts) > 1 else os.path.splitext(f)[0].upper()
-            code = name_parts[-1] if len(name_parts) > 1 else 'c'
-            if base not in moves: moves[base] = {}
-            moves[base][code] = f
-
+        # Library index: rendered from memory, folders are only rescanned when they change
+        moves = game_logic.get_available_moves()
         for move_name, angles in moves.items():
             self.create_hub_card(scroll, move_name, angles, profile)
 
@@ -203,9 +191,7 @@ class MorpheusTerminal(ctk.CTk):
         display_name = name.replace("DUNK", "ESCAPE DRILL").replace("PUNCH", "STRIKE DEFENSE")
         ctk.CTkLabel(card, text=display_name, font=("Courier", 22, "bold"), text_color="white").pack(side="left", padx=30, pady=20)
         
-        is_ready = False
-        for code, vid in angles.items():
-            if os.path.exists(os.path.join(SKELETON_FOLDER, f"{os.path.splitext(vid)[0]}_coords.json")): is_ready = True
+        is_ready = any(game_logic.check_skeleton_data(vid) for vid in angles.values())
 
         state = "normal" if is_ready else "disabled"
         color = "#00FF41" if is_ready else "gray"
@@ -280,32 +266,25 @@ class MorpheusTerminal(ctk.CTk):
         
         if not os.path.exists(MISTAKES_FOLDER): os.makedirs(MISTAKES_FOLDER)
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        target_log = os.path.join(MISTAKES_FOLDER, f"log_{timestamp}.json")
+        target_log = session_log_path(MISTAKES_FOLDER)
+        move_name = os.path.splitext(video_file)[0].rsplit('_', 1)[0].upper()
         
         print(f"\n[APP] Launching Tracker...")
         print(f"[APP] Target Log: {target_log}")
 
         try:
-            # Run Live Tracker (Pass the target log path)
-            subprocess.run([sys.executable, LIVE_SCRIPT, json_path, target_log], check=False)
-            
-            # Run AI Coach
-            if os.path.exists(target_log):
-                print("[APP] Log found. Running Coach...")
-                subprocess.run([sys.executable, COACH_SCRIPT, target_log], check=False)
-            else:
-                print("[APP] Target log not found immediately. Proceeding to discovery.")
+            # Run Live Tracker + AI Coach (the tracker writes one result file for this session)
+            result = game_logic.run_training_session(json_path, target_log, move_name, profile.get('alias'))
+            if result is None:
+                print("[APP] Target log not found. Proceeding to discovery.")
 
             # Update XP
-            if os.path.exists(SESSION_STATS_PATH):
-                with open(SESSION_STATS_PATH, 'r') as f:
-                    stats = json.load(f)
-                profile['xp'] += stats.get("xp_gained", 0)
+            if result is not None:
+                profile['xp'] += result.xp_gained
                 if profile['xp'] > profile['level'] * 100:
                     profile['level'] += 1
                     profile['xp'] = 0
-                with open(PROFILE_FILE, "w") as pf: json.dump(profile, pf)
+                profile_store.get_store().save(profile, flush=True)
 
         except Exception as e:
             print(f"[APP] Process Error: {e}")
@@ -341,13 +320,10 @@ class MorpheusTerminal(ctk.CTk):
         review_player.pack(expand=True)
         
         # --- AUTO-DISCOVERY LOGIC ---
-        analysis_path = None
-        if os.path.exists(MISTAKES_FOLDER):
-            files = [os.path.join(MISTAKES_FOLDER, f) for f in os.listdir(MISTAKES_FOLDER) if f.endswith("_analysis.json")]
-            if files:
-                newest_file = max(files, key=os.path.getmtime)
-                print(f"[APP] Loaded Analysis: {newest_file}")
-                analysis_path = newest_file
+        session_store.ensure_backfilled()
+        analysis_path = session_store.get_latest_analysis_path()
+        if analysis_path:
+            print(f"[APP] Loaded Analysis: {analysis_path}")
 
         if analysis_path and os.path.exists(analysis_path):
             try:
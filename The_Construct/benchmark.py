@@ -0,0 +1,220 @@
+import json
+import os
+import sys
+import time
+import argparse
+import tempfile
+from types import SimpleNamespace
+import numpy as np
+
+import config
+import scoring
+import tracker
+import visualizer
+
+# --- CONFIGURATION ---
+SYNTH_FRAMES = 300        # ~10s of tape at 30 FPS
+SYNTH_SEED = 1337         # Fixed seed so every run sees identical poses
+NUM_LANDMARKS = 33
+REGRESSION_TOLERANCE = 0.25  # Flag anything 25% slower than the baseline
+FRAME_SIZE = (1280, 720)  # Raw webcam frame fed to the player conversion
+PLAYER_SIZE = (800, 500)  # BriefingRoomScreen player size
+
+# --- FIXTURES ---
+def make_synthetic_tape(num_frames=SYNTH_FRAMES, seed=SYNTH_SEED):
+    """Builds a tape in the processor.py JSON layout: a standing pose with
+    smooth arm/leg motion plus a little sensor jitter."""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.3, 0.7, size=(NUM_LANDMARKS, 3))
+    phase = rng.uniform(0, 2 * np.pi, size=NUM_LANDMARKS)
+    frames = []
+    for i in range(num_frames):
+        t = i / 30.0
+        swing = 0.08 * np.sin(2 * np.pi * 0.5 * t + phase)
+        jitter = rng.normal(0, 0.003, size=(NUM_LANDMARKS, 3))
+        pts = base + jitter
+        pts[:, 0] += swing
+        pts[:, 1] += swing * 0.5
+        frames.append({
+            'frame': i, 'timestamp_ms': int(t * 1000),
+            'landmarks': [{'id': j, 'x': float(p[0]), 'y': float(p[1]), 'z': float(p[2]), 'v': 0.9}
+                          for j, p in enumerate(pts)],
+            # Rough metric equivalent for world-space scoring (about 1.7m tall)
+            'world': [{'id': j, 'x': float(p[0] - 0.5) * 1.7, 'y': float(p[1] - 0.5) * 1.7, 'z': float(p[2] - 0.5) * 1.7}
+                      for j, p in enumerate(pts)]
+        })
+    return frames
+
+def to_live_landmarks(frame, visibility=0.9, key='landmarks'):
+    """Mimics MediaPipe's landmark objects (attribute access) from a tape frame."""
+    return [SimpleNamespace(x=l['x'], y=l['y'], z=l.get('z', 0.0), visibility=visibility)
+            for l in frame[key]]
+
+def load_fixture(tape_path=None, synthetic=False):
+    """Returns (label, frames). Uses a recorded tape when one is given or
+    found in SKELETON_FOLDER, otherwise the synthetic tape."""
+    if synthetic: return "synthetic", make_synthetic_tape()
+    if tape_path is None and os.path.exists(config.SKELETON_FOLDER):
+        tapes = sorted(f for f in os.listdir(config.SKELETON_FOLDER) if f.endswith("_coords.json"))
+        if tapes: tape_path = os.path.join(config.SKELETON_FOLDER, tapes[0])
+
+    if tape_path:
+        frames = [f for f in scoring.load_tape(tape_path) if f['landmarks']]
+        if frames: return os.path.basename(tape_path), frames
+    return "synthetic", make_synthetic_tape()
+
+# --- TIMER ---
+def time_call(fn, number, repeat=5):
+    """Runs fn `number` times per round and returns the best per-call time (seconds)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+# --- CASES ---
+def build_cases(frames):
+    """Returns {case_name: (callable, calls_per_round, frames_per_call)} for every hot path."""
+    target_features = [scoring.get_full_body_features(f['landmarks'], True) for f in frames]
+    live_frames = [to_live_landmarks(f) for f in frames]
+    n = len(frames)
+    mid = n // 2
+    curr_full = live_frames[mid]
+    curr_rel = scoring.get_full_body_features(curr_full)
+    vis = scoring.get_visibility(curr_full)
+    clean_frames = visualizer.smooth_data(frames, visualizer.SMOOTHING_WINDOW)
+    phase_index = visualizer.PhaseIndex(visualizer.detect_phases(clean_frames))
+
+    engine = tracker.TrackerEngine()
+    engine.load_reference(frames)
+
+    def tracker_frame():
+        # Replays the tape so the engine keeps advancing instead of stalling at the end
+        if engine.is_finished: engine.reset()
+        engine.process_frame(live_frames[min(engine.current_target_idx + 1, n - 1)])
+
+    cases = {
+        "features_json": (lambda: scoring.get_full_body_features(frames[mid]['landmarks'], True), 2000, 1),
+        "features_live": (lambda: scoring.get_full_body_features(curr_full), 2000, 1),
+        "evaluate_groups": (lambda: scoring.evaluate_groups(curr_full, curr_rel, target_features[mid]), 2000, 1),
+        "search_window": (lambda: scoring.search_window(curr_full, curr_rel, target_features, mid), 200, 1),
+        "tracker_frame": (tracker_frame, 200, 1),
+        "diagnose": (lambda: scoring.diagnose(curr_rel, target_features[mid], vis), 2000, 1),
+        "procrustes_window": (lambda: scoring.evaluate_groups_batch(
+            curr_rel, vis, engine.target_stack[:, max(0, mid - 10):mid + 10], procrustes=True), 200, 1),
+        "smooth_data": (lambda: visualizer.smooth_data(frames, visualizer.SMOOTHING_WINDOW), 3, n),
+        "detect_phases": (lambda: visualizer.detect_phases(clean_frames), 3, n),
+        "phase_lookup": (lambda: phase_index.phase_at(mid), 2000, 1),
+    }
+
+    # World-space scoring only runs on tapes recorded with world landmarks
+    if scoring.has_world_landmarks(frames):
+        world_frames = [to_live_landmarks(f, key='world') for f in frames]
+        world_engine = tracker.TrackerEngine(space="world")
+        world_engine.load_reference(frames)
+
+        def tracker_frame_world():
+            if world_engine.is_finished: world_engine.reset()
+            i = min(world_engine.current_target_idx + 1, n - 1)
+            world_engine.process_frame(live_frames[i], world_landmarks=world_frames[i])
+        cases["tracker_frame_world"] = (tracker_frame_world, 200, 1)
+    else:
+        print("[BENCH] Skipping tracker_frame_world: tape has no world landmarks")
+
+    # Tape loading goes through a real file so JSON parsing is measured
+    tmp = tempfile.NamedTemporaryFile("w", suffix="_coords.json", delete=False)
+    json.dump({"coordinates": frames}, tmp)
+    tmp.close()
+    cases["load_tape"] = (lambda: scoring.load_tape(tmp.name), 3, n)
+
+    # Player conversion needs cv2/PIL/customtkinter; skip it on headless boxes
+    try:
+        import components
+        raw = np.random.default_rng(SYNTH_SEED).integers(0, 255, size=(FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+        cases["frame_conversion"] = (lambda: components.fit_frame_to_canvas(raw, *PLAYER_SIZE), 50, 1)
+    except ImportError as e:
+        print(f"[BENCH] Skipping frame_conversion: {e}")
+
+    return cases, tmp.name
+
+# --- BASELINE ---
+def load_baseline(path, label):
+    """Returns the stored per-case results, or {} if the baseline was recorded on another fixture."""
+    if not os.path.exists(path): return {}
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"[BENCH] Could not read baseline: {e}")
+        return {}
+    if data.get("fixture") != label:
+        print(f"[BENCH] Baseline fixture '{data.get('fixture')}' differs from '{label}'. Not comparing.")
+        return {}
+    return data.get("cases", {})
+
+def save_baseline(path, label, results):
+    with open(path, 'w') as f:
+        json.dump({"fixture": label, "created": time.strftime("%Y-%m-%d %H:%M:%S"), "cases": results}, f, indent=2)
+    print(f"[BENCH] Baseline saved to {path}")
+
+def compare(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """Returns the names of cases slower than baseline * (1 + tolerance)."""
+    regressions = []
+    for name, res in results.items():
+        ref = baseline.get(name)
+        if ref and res["ms_per_call"] > ref["ms_per_call"] * (1 + tolerance):
+            regressions.append(name)
+    return regressions
+
+# --- MAIN ---
+def run(tape_path=None, only=None, synthetic=False):
+    label, frames = load_fixture(tape_path, synthetic)
+    print(f"[BENCH] Fixture: {label} ({len(frames)} frames)")
+
+    cases, tmp_path = build_cases(frames)
+    results = {}
+    try:
+        for name, (fn, number, frames_per_call) in cases.items():
+            if only and name not in only: continue
+            per_call = time_call(fn, number)
+            results[name] = {
+                "ms_per_call": round(per_call * 1000, 4),
+                "frames_per_sec": round(frames_per_call / per_call, 1) if per_call > 0 else 0,
+            }
+    finally:
+        os.remove(tmp_path)
+    return label, results
+
+def print_report(results, baseline):
+    print(f"\n{'CASE':<18}{'MS/CALL':>12}{'FRAMES/S':>12}{'BASELINE':>12}{'DELTA':>10}")
+    for name, res in results.items():
+        ref = baseline.get(name)
+        base_txt, delta_txt = "-", ""
+        if ref:
+            base_txt = f"{ref['ms_per_call']:.4f}"
+            delta_txt = f"{(res['ms_per_call'] / ref['ms_per_call'] - 1) * 100:+.0f}%"
+        print(f"{name:<18}{res['ms_per_call']:>12.4f}{res['frames_per_sec']:>12.1f}{base_txt:>12}{delta_txt:>10}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the pose scoring and tagging hot paths.")
+    parser.add_argument("--tape", help="Recorded *_coords.json fixture (defaults to the first tape in sck/, else synthetic)")
+    parser.add_argument("--synthetic", action="store_true", help="Force the synthetic fixture")
+    parser.add_argument("--only", nargs="*", help="Run only these cases")
+    parser.add_argument("--baseline", default=config.BENCH_BASELINE_FILE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    args = parser.parse_args()
+
+    label, results = run(args.tape, args.only, args.synthetic)
+    baseline = load_baseline(args.baseline, label)
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, label, results)
+        sys.exit(0)
+
+    regressions = compare(results, baseline)
+    if regressions:
+        print(f"\n[BENCH] REGRESSION in: {', '.join(regressions)} (>{int(REGRESSION_TOLERANCE * 100)}% slower than baseline)")
+        sys.exit(1)
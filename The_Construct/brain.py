@@ -1,6 +1,20 @@
 import os
-from llama_cpp import Llama
-from huggingface_hub import hf_hub_download
+import re
+import sys
+import json
+import time
+import hashlib
+import secrets
+import queue
+import threading
+import subprocess
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+import config
+import tip_cache
+
+# llama_cpp / huggingface_hub are imported when the model is loaded, so
+# clients that only talk to the coaching server never pay for them.
 
 # CONFIGURATION
 REPO_ID = "Qwen/Qwen2.5-0.5B-Instruct-GGUF"
@@ -8,10 +22,24 @@ FILENAME = "qwen2.5-0.5b-instruct-q4_k_m.gguf" # The specific "quantized" file
 MODEL_DIR = "./models"
 MODEL_PATH = os.path.join(MODEL_DIR, FILENAME)
 
+# Coaching server
+BATCH_WINDOW = 0.02    # Seconds to wait for more requests before generating a batch
+BATCH_MAX = 32         # Tips generated per batch at most
+SERVER_START_TIMEOUT = 30.0
+REPLY_TIMEOUT = 10.0   # Seconds to wait for a reply (or the next streamed token) before giving up on the server
+TIP_TIMEOUT = 2.0      # Extra seconds allowed per tip in a batch request
+MAX_MESSAGE = 1 << 20  # Bytes; longer messages are refused
+
+# Streaming: text is handed to speech a phrase at a time
+PHRASE_MAX_WORDS = 4   # A phrase ends at punctuation or after this many words
+
 def load_model():
     """
     Downloads the model if missing, then loads it into RAM.
     """
+    from llama_cpp import Llama
+    from huggingface_hub import hf_hub_download
+
     if not os.path.exists(MODEL_PATH):
         print(f"Downloading {FILENAME}... this happens only once.")
         os.makedirs(MODEL_DIR, exist_ok=True)
@@ -19,30 +47,438 @@ def load_model():
         print("Download complete.")
 
     # Initialize the model
-    # n_ctx=512 is small to keep it fast. 
+    # n_ctx=512 is small to keep it fast.
     # verbose=False stops it from spamming your terminal.
-    return Llama(model_path=MODEL_PATH, n_ctx=512, verbose=False)
+    # use_mmap maps the weights instead of copying them, so a warm server shares the page cache.
+    return Llama(model_path=MODEL_PATH, n_ctx=512, use_mmap=True, verbose=False)
 
-# Global instance (so we don't reload it every time)
-llm = load_model()
+# Loaded on first use (so we don't reload it every time, and importing is free)
+_llm = None
+_llm_lock = threading.Lock()
+_stream_llm = None
 
-def get_coaching_tip(joint_name, issue):
+def get_model():
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            _llm = load_model()
+        return _llm
+
+def get_stream_model():
     """
-    Generates a fast, aggressive coaching tip.
+    A second instance for the server's stream worker, so a streamed tip never
+    waits for a batch (or the other way round) on a model that isn't
+    thread-safe. The weights are memory-mapped, so both share one copy.
+    """
+    global _stream_llm
+    with _llm_lock:
+        if _stream_llm is None:
+            _stream_llm = load_model()
+        return _stream_llm
+
+def build_prompt(joint_name, issue):
+    return f"System: You are a tough gym coach. Keep it under 10 words.\nUser: My {joint_name} is {issue}. Fix it.\nCoach:"
+
+# Cached tips are only reused while the prompt and model stay the same
+PROMPT_VERSION = hashlib.sha1((build_prompt("{joint}", "{issue}") + FILENAME).encode()).hexdigest()[:10]
+
+def generate_tip(joint_name, issue):
+    """
+    Generates a fast, aggressive coaching tip in this process.
     """
-    prompt = f"System: You are a tough gym coach. Keep it under 10 words.\nUser: My {joint_name} is {issue}. Fix it.\nCoach:"
-    
-    output = llm(
-        prompt, 
+    output = get_model()(
+        build_prompt(joint_name, issue),
         max_tokens=20, # Keep it short = Faster
-        stop=["User:", "\n"], 
+        stop=["User:", "\n"],
         echo=False
     )
-    
+
     return output['choices'][0]['text'].strip()
 
+def generate_tip_stream(joint_name, issue, model=None):
+    """
+    Same as generate_tip, but yields the text piece by piece as the model produces it.
+    """
+    for chunk in (model or get_model())(build_prompt(joint_name, issue), max_tokens=20, stop=["User:", "\n"],
+                                        echo=False, stream=True):
+        yield chunk['choices'][0]['text']
+
+def _server_tip_stream(joint_name, issue):
+    return generate_tip_stream(joint_name, issue, get_stream_model())
+
+# --- WIRE FORMAT ---
+# Messages are JSON, never pickles, so a stray local process can't run code
+# in the server or the app. The connection handshake is an HMAC challenge
+# with a random key that only this user can read.
+_authkey = None
+
+def get_authkey(path=None):
+    """The install's server key, made on first use with owner-only permissions."""
+    global _authkey
+    if _authkey is not None and path is None: return _authkey
+    path = path or config.BRAIN_KEY_FILE
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_hex(32))
+    if os.name != "nt" and os.stat(path).st_mode & 0o077:
+        print(f"[BRAIN] {path} was readable by other users; restricting it to the owner.")
+        os.chmod(path, 0o600)
+    for _ in range(20):  # Another process may have created it a moment ago and still be writing
+        with open(path, 'r') as f:
+            key = f.read().strip().encode()
+        if key: break
+        time.sleep(0.05)
+    else:
+        raise OSError(f"{path} is empty")
+    if path == config.BRAIN_KEY_FILE: _authkey = key
+    return key
+
+def _send(conn, message):
+    conn.send_bytes(json.dumps(message).encode())
+
+def _recv(conn, timeout=None):
+    """Next message from conn. Raises TimeoutError if none arrives within timeout
+    and ValueError if it isn't a JSON object."""
+    if timeout is not None and not conn.poll(timeout):
+        raise TimeoutError("coaching server did not answer")
+    message = json.loads(conn.recv_bytes(MAX_MESSAGE).decode())
+    if not isinstance(message, dict): raise ValueError("message is not an object")
+    return message
+
+def _tip_items(value):
+    """[(joint, issue), ...] from a request, or None if it isn't a list of string pairs."""
+    if not isinstance(value, list): return None
+    items = [tuple(item) for item in value if isinstance(item, list) and len(item) == 2]
+    if len(items) != len(value) or not all(isinstance(x, str) for item in items for x in item): return None
+    return items
+
+# Connection errors that mean "no usable server": generate locally instead
+SERVER_ERRORS = (OSError, EOFError, ValueError, AuthenticationError)
+
+# --- COACHING SERVER ---
+class _TipRequest:
+    def __init__(self, items):
+        self.items = items
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+        self.tokens = None  # Set for streaming requests: text pieces, then None
+        self.cancelled = threading.Event()  # The streaming client went away
+
+class TipBatcher:
+    """
+    Collects tip requests from every client connection and generates them
+    on one thread (the model is not thread-safe). Requests that arrive within
+    BATCH_WINDOW are handled together, and each distinct (joint, issue) in a
+    batch is generated once no matter how many clients asked for it.
+    Streaming requests run one at a time on a thread of their own, with their
+    own model, so a streamed tip never holds up a batch.
+    """
+    def __init__(self, generate=generate_tip, stream=_server_tip_stream, window=BATCH_WINDOW, max_batch=BATCH_MAX):
+        self.generate = generate
+        self.stream = stream
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = queue.Queue()
+        self.pending_streams = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+        threading.Thread(target=self._run_streams, daemon=True).start()
+
+    def submit(self, items):
+        """Blocks until every (joint, issue) in items has a tip. Returns them in order."""
+        request = _TipRequest([tuple(item) for item in items])
+        self.pending.put(request)
+        request.done.wait()
+        if request.error: raise RuntimeError(request.error)
+        return request.results
+
+    def submit_stream(self, item):
+        """Yields the tip for one (joint, issue) piece by piece as the model produces it.
+        Closing the generator early stops the generation."""
+        request = _TipRequest([tuple(item)])
+        request.tokens = queue.Queue()
+        self.pending_streams.put(request)
+        try:
+            while True:
+                token = request.tokens.get()
+                if token is None: break
+                yield token
+        finally:
+            request.cancelled.set()
+        if request.error: raise RuntimeError(request.error)
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            size = len(batch[0].items)
+            deadline = time.monotonic() + self.window
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0: break
+                try:
+                    request = self.pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.items)
+
+            unique = dict.fromkeys(item for request in batch for item in request.items)
+            try:
+                tips = {item: self.generate(*item) for item in unique}
+                for request in batch:
+                    request.results = [tips[item] for item in request.items]
+            except Exception as e:
+                for request in batch: request.error = str(e)
+            for request in batch: request.done.set()
+
+    def _run_streams(self):
+        while True:
+            request = self.pending_streams.get()
+            if request.cancelled.is_set(): continue
+            tokens = None
+            try:
+                tokens = self.stream(*request.items[0])
+                for token in tokens:
+                    if request.cancelled.is_set(): break  # Nobody is reading any more
+                    request.tokens.put(token)
+            except Exception as e:
+                request.error = str(e)
+            finally:
+                if hasattr(tokens, "close"): tokens.close()
+            request.tokens.put(None)
+
+def _serve_connection(conn, batcher, stop, wake):
+    with conn:
+        while not stop.is_set():
+            try:
+                message = _recv(conn)
+            except (EOFError, OSError):
+                return
+            except ValueError as e:
+                _send(conn, {"error": f"bad request: {e}"})
+                continue
+            if message.get("shutdown"):
+                stop.set()
+                _send(conn, {"ok": True})
+                wake()  # Unblocks the accept() loop so it sees the stop flag
+                return
+            if message.get("ping"):
+                _send(conn, {"ok": True})
+                continue
+            if "stream" in message:
+                items = _tip_items([message["stream"]])
+                if items is None:
+                    _send(conn, {"error": "bad request: stream needs [joint, issue]"})
+                    continue
+                tokens = batcher.submit_stream(items[0])
+                try:
+                    for token in tokens:
+                        _send(conn, {"token": token})
+                    _send(conn, {"done": True})
+                except OSError:
+                    return  # Client disconnected; closing tokens stops the generation
+                except Exception as e:
+                    _send(conn, {"error": str(e)})
+                finally:
+                    tokens.close()
+                continue
+            items = _tip_items(message.get("tips", []))
+            if items is None:
+                _send(conn, {"error": "bad request: tips needs [[joint, issue], ...]"})
+                continue
+            try:
+                _send(conn, {"tips": batcher.submit(items)})
+            except Exception as e:
+                _send(conn, {"error": str(e)})
+
+def serve(address=config.BRAIN_ADDRESS, authkey=None):
+    """Runs the coaching daemon: loads the model once, then answers tip requests until shut down."""
+    authkey = authkey or get_authkey()
+    print("[BRAIN] Loading model...")
+    get_model()
+    batcher = TipBatcher()
+    stop = threading.Event()
+    wake = lambda: Client(address, authkey=authkey).close()
+    with Listener(address, authkey=authkey) as listener:
+        print(f"[BRAIN] Coaching server ready on {address[0]}:{address[1]}")
+        while not stop.is_set():
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, AuthenticationError) as e:
+                print(f"[BRAIN] Rejected connection: {e}")
+                continue
+            if stop.is_set():
+                conn.close()
+                break
+            threading.Thread(target=_serve_connection, args=(conn, batcher, stop, wake), daemon=True).start()
+    print("[BRAIN] Coaching server stopped.")
+
+# --- CLIENT ---
+def _connect(address=config.BRAIN_ADDRESS):
+    return Client(address, authkey=get_authkey())
+
+def _request(message, timeout=REPLY_TIMEOUT, address=config.BRAIN_ADDRESS):
+    with _connect(address) as conn:
+        _send(conn, message)
+        return _recv(conn, timeout)
+
+def server_running():
+    try:
+        return _request({"ping": True}, timeout=2.0).get("ok", False)
+    except SERVER_ERRORS:
+        return False
+
+def start_server(wait=True, timeout=SERVER_START_TIMEOUT):
+    """Starts the coaching daemon in the background if it isn't up. With wait,
+    blocks until it answers (or timeout) and returns whether it is running."""
+    if server_running(): return True
+    print("[BRAIN] Starting coaching server...")
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve"], cwd=config.BASE_DIR,
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait: return False
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server_running(): return True
+        time.sleep(0.25)
+    return False
+
+def stop_server():
+    try:
+        _request({"shutdown": True}, timeout=2.0)
+    except SERVER_ERRORS:
+        pass
+
+def get_coaching_tips(items, use_cache=True):
+    """
+    Tips for a list of (joint_name, issue) pairs. Cached tips come straight
+    from the tip cache; the rest go to the warm server in one round-trip
+    (or are generated in this process if no server answers) and are cached.
+    """
+    items = [tuple(item) for item in items]
+    if not items: return []
+    if not use_cache: return _generate_many(items)
+
+    cache = tip_cache.get_cache(PROMPT_VERSION)
+    keys = [(tip_cache.normalize(joint), tip_cache.normalize(issue)) for joint, issue in items]
+    tips = {key: cache.get(*key) for key in dict.fromkeys(keys)}
+    missing = [key for key, tip in tips.items() if tip is None]
+    if missing:
+        generated = dict(zip(missing, _generate_many(missing)))
+        cache.put_many(generated.items())
+        tips.update(generated)  # Not read back: the cache may already have evicted them
+    return [tips[key] for key in keys]
+
+def _generate_many(items):
+    try:
+        reply = _request({"tips": items}, timeout=REPLY_TIMEOUT + TIP_TIMEOUT * len(items))
+        if "tips" in reply: return reply["tips"]
+        print(f"[BRAIN] Server error: {reply.get('error')}. Generating locally.")
+    except SERVER_ERRORS:
+        pass
+    return [generate_tip(*item) for item in items]
+
+def get_coaching_tip(joint_name, issue):
+    """
+    Generates a fast, aggressive coaching tip.
+    """
+    return get_coaching_tips([(joint_name, issue)])[0]
+
+# --- STREAMING ---
+def stream_coaching_tip(joint_name, issue, use_cache=True):
+    """
+    Yields the tip as text pieces as soon as the model produces them (from the
+    warm server when it is up). A cached tip comes back whole in one piece.
+    """
+    cache = tip_cache.get_cache(PROMPT_VERSION) if use_cache else None
+    tip = cache.get(joint_name, issue) if cache is not None else None
+    if tip is not None:
+        yield tip
+        return
+
+    pieces = []
+    complete = yield from _stream_tokens(joint_name, issue, pieces)
+    if cache is not None and complete: cache.put(joint_name, issue, "".join(pieces).strip())
+
+def _stream_tokens(joint_name, issue, received):
+    """
+    Yields the tip's pieces (appending each to received) and returns whether
+    the whole tip arrived. Like _generate_many, it generates locally when
+    the server can't be reached, fails or stops answering before the first
+    piece; if that happens later, the tip just ends early.
+    """
+    try:
+        conn = _connect()
+    except SERVER_ERRORS:
+        conn = None
+    if conn is not None:
+        with conn:
+            try:
+                _send(conn, {"stream": [joint_name, issue]})
+                while True:
+                    reply = _recv(conn, REPLY_TIMEOUT)
+                    if "token" in reply:
+                        received.append(reply["token"])
+                        yield reply["token"]
+                    elif "error" in reply:
+                        raise RuntimeError(reply["error"])
+                    else:
+                        return True
+            except (RuntimeError,) + SERVER_ERRORS as e:
+                if received:
+                    print(f"[BRAIN] Tip stream cut off: {e}")
+                    return False
+                print(f"[BRAIN] Server error: {e}. Generating locally.")
+
+    for piece in generate_tip_stream(joint_name, issue):
+        received.append(piece)
+        yield piece
+    return True
+
+def _phrase_end(text, max_words):
+    """Index just past the first complete phrase in text, or None if it isn't complete yet."""
+    cuts = []
+    punct = re.search(r"[.,!?;:]\s", text)
+    if punct: cuts.append(punct.start() + 1)
+    words = list(re.finditer(r"\S+\s", text))  # Only words followed by a space are finished
+    if len(words) >= max_words: cuts.append(words[max_words - 1].end())
+    return min(cuts) if cuts else None
+
+def phrases(pieces, max_words=PHRASE_MAX_WORDS):
+    """
+    Regroups streamed text pieces into speakable phrases. A phrase ends at
+    punctuation or after max_words words, so speech can start on the first
+    few tokens instead of waiting for the whole tip.
+    """
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        cut = _phrase_end(buffer, max_words)
+        while cut is not None:
+            phrase, buffer = buffer[:cut].strip(), buffer[cut:]
+            if phrase: yield phrase
+            cut = _phrase_end(buffer, max_words)
+    if buffer.strip(): yield buffer.strip()
+
+def stream_phrases(joint_name, issue, use_cache=True):
+    """The coaching tip as phrases, ready for VoiceCommander.speak_stream."""
+    return phrases(stream_coaching_tip(joint_name, issue, use_cache))
+
 # --- TEST BLOCK ---
 if __name__ == "__main__":
-    start = os.times()[4]
-    print(get_coaching_tip("knees", "caving in"))
-    print(f"Response time: {os.times()[4] - start:.4f}s")
\ No newline at end of file
+    if "--serve" in sys.argv:
+        serve()
+    elif "--stop" in sys.argv:
+        stop_server()
+    elif "--prewarm" in sys.argv:
+        # Offline fill of every joint x issue tip; uses the server when it is up
+        tip_cache.prewarm(tip_cache.get_cache(PROMPT_VERSION), _generate_many)
+    else:
+        start = time.perf_counter()
+        for i, phrase in enumerate(stream_phrases("knees", "caving in", use_cache=False)):
+            if i == 0: print(f"First phrase after: {time.perf_counter() - start:.4f}s")
+            print(f"  {phrase}")
+        print(f"Response time: {time.perf_counter() - start:.4f}s")
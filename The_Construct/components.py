@@ -1,17 +1,53 @@
 import customtkinter as ctk
-import cv2
-from PIL import Image, ImageTk
+import os
 import threading
-import pyttsx3
+import queue
+import speech
+
+# cv2, PIL and pyttsx3 are imported inside the functions that use them.
+# They cost more than Tk itself to load, and the login screen needs none of them.
+
+# --- FRAME CONVERSION ---
+def fit_frame_to_canvas(frame, width, height):
+    """Letterboxes a BGR OpenCV frame into a fixed-size RGB PIL canvas."""
+    import cv2
+    from PIL import Image
+
+    # 1. Get Raw Video Dimensions
+    h, w = frame.shape[:2]
+    
+    # 2. Calculate Scale to FIT inside the FIXED box (Maintain Aspect Ratio)
+    # We compare video ratio to box ratio
+    scale = min(width / w, height / h)
+    new_w = int(w * scale)
+    new_h = int(h * scale)
+    
+    # 3. Resize the video frame
+    frame_resized = cv2.resize(frame, (new_w, new_h))
+    
+    # 4. Create a Black Background (The "Canvas") of the FIXED size
+    # This ensures the UI element stays exactly 700x400 (or whatever you set)
+    canvas = Image.new("RGB", (width, height), (0, 0, 0))
+    
+    # 5. Paste video in the center
+    paste_x = (width - new_w) // 2
+    paste_y = (height - new_h) // 2
+    
+    # Convert OpenCV Image to PIL
+    frame_pil = Image.fromarray(cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB))
+    canvas.paste(frame_pil, (paste_x, paste_y))
+    return canvas
 
 # --- VIDEO PLAYER (FIXED DIMENSIONS) ---
 class VideoPlayer(ctk.CTkLabel):
     def __init__(self, master, width=600, height=400, video_path=None):
         # Initialize the Label with a FIXED size. It will not shrink/grow.
         super().__init__(master, text="", width=width, height=height, fg_color="black")
+        import cv2
         
         self.video_path = video_path
         self.cap = cv2.VideoCapture(video_path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
         
         # We store the FIXED target dimensions. These never change.
         self.fixed_width = width
@@ -27,6 +63,7 @@ class VideoPlayer(ctk.CTkLabel):
 
     def update_frame(self):
         if self.is_destroyed or not self.cap.isOpened(): return
+        import cv2
 
         ret, frame = self.cap.read()
         if not ret:
@@ -34,29 +71,7 @@ class VideoPlayer(ctk.CTkLabel):
             ret, frame = self.cap.read()
 
         if ret:
-            # 1. Get Raw Video Dimensions
-            h, w = frame.shape[:2]
-            
-            # 2. Calculate Scale to FIT inside the FIXED box (Maintain Aspect Ratio)
-            # We compare video ratio to box ratio
-            scale = min(self.fixed_width / w, self.fixed_height / h)
-            new_w = int(w * scale)
-            new_h = int(h * scale)
-            
-            # 3. Resize the video frame
-            frame_resized = cv2.resize(frame, (new_w, new_h))
-            
-            # 4. Create a Black Background (The "Canvas") of the FIXED size
-            # This ensures the UI element stays exactly 700x400 (or whatever you set)
-            canvas = Image.new("RGB", (self.fixed_width, self.fixed_height), (0, 0, 0))
-            
-            # 5. Paste video in the center
-            paste_x = (self.fixed_width - new_w) // 2
-            paste_y = (self.fixed_height - new_h) // 2
-            
-            # Convert OpenCV Image to PIL
-            frame_pil = Image.fromarray(cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB))
-            canvas.paste(frame_pil, (paste_x, paste_y))
+            canvas = fit_frame_to_canvas(frame, self.fixed_width, self.fixed_height)
             
             # 6. Display
             ctk_img = ctk.CTkImage(light_image=canvas, dark_image=canvas, 
@@ -67,11 +82,15 @@ class VideoPlayer(ctk.CTkLabel):
         if self.is_playing and not self.is_destroyed:
             self.after_id = self.after(33, self.update_frame)
 
-    def seek(self, frame_index):
+    def seek(self, frame_index, on_ready=None):
+        """Jumps to frame_index and keeps playing from there. on_ready() runs once
+        that frame is on screen (right away if there is no video)."""
         if not self.is_destroyed and self.cap.isOpened():
+            import cv2
             self.cap.set(cv2.CAP_PROP_POS_FRAMES, max(0, frame_index))
             self.is_playing = True
             self.update_frame()
+        if on_ready: on_ready()
 
     def play(self):
         if not self.is_playing:
@@ -84,26 +103,245 @@ class VideoPlayer(ctk.CTkLabel):
         if self.after_id: self.after_cancel(self.after_id)
         if self.cap.isOpened(): self.cap.release()
 
+# --- THUMBNAILS ---
+_thumbnails = {}
+
+def load_thumbnail(path, size):
+    """CTkImage for a pre-rendered preview image (previews.py), decoded once per file version."""
+    key = (path, os.path.getmtime(path), size)
+    if key not in _thumbnails:
+        from PIL import Image
+        img = Image.open(path)
+        img.load()
+        _thumbnails[key] = ctk.CTkImage(light_image=img, dark_image=img, size=size)
+    return _thumbnails[key]
+
+# --- SCORE CHART ---
+class ScoreChart(ctk.CTkCanvas):
+    """Score-over-time line for a session's telemetry, with mistakes marked in red."""
+    def __init__(self, master, width=640, height=110, **kwargs):
+        super().__init__(master, width=width, height=height, bg="#0F172A", highlightthickness=0, **kwargs)
+        self.chart_w, self.chart_h = width, height
+
+    def plot(self, times, scores, markers=()):
+        """times/scores are telemetry columns; markers are times (seconds) to flag."""
+        import numpy as np
+        w, h = self.chart_w, self.chart_h
+        self.delete("all")
+        if len(times) < 2 or times[-1] <= 0:
+            self.create_text(w // 2, h // 2, text="NO TELEMETRY", fill="#334155", font=("Roboto Mono", 11))
+            return
+
+        def y_of(score): return h - 5 - (score / 100) * (h - 10)
+
+        # Average down to one point per pixel column so long sessions draw as fast as short ones
+        cols = (np.asarray(times) / times[-1] * (w - 1)).astype(int)
+        counts = np.bincount(cols, minlength=w)
+        sums = np.bincount(cols, weights=scores, minlength=w)
+        xs = np.nonzero(counts)[0]
+        ys = y_of(sums[xs] / counts[xs])
+
+        self.create_line(0, y_of(80), w, y_of(80), fill="#334155", dash=(4, 2))
+        for t in markers:
+            x = t / times[-1] * (w - 1)
+            self.create_line(x, 0, x, h, fill="#F87171")
+        if len(xs) > 1:
+            self.create_line(*np.column_stack([xs, ys]).ravel().tolist(), fill="#0EA5E9", width=2)
+        self.create_text(8, 8, text="SCORE", anchor="nw", fill="#94A3B8", font=("Roboto Mono", 9))
+
+# --- VIRTUAL LIST ---
+class VirtualList(ctk.CTkFrame):
+    """
+    A scrolling list that only builds widgets for the rows on screen.
+    Rows are pooled and re-filled as you scroll; data is fetched page by
+    page on one background worker and handed back to Tk through a queue.
+
+    create_row(parent) -> widget   builds one pooled row (fixed row_height)
+    fill_row(widget, item)         shows an item (None while its page loads)
+    """
+    def __init__(self, master, row_height, create_row, fill_row, page_size=50,
+                 empty_text="NO DATA", **kwargs):
+        super().__init__(master, **kwargs)
+        self.row_height = row_height
+        self.create_row = create_row
+        self.fill_row = fill_row
+        self.page_size = page_size
+
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent")
+        self.viewport.pack(side="left", fill="both", expand=True)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.empty_lbl = ctk.CTkLabel(self.viewport, text=empty_text, font=("Roboto Mono", 14), text_color="gray")
+
+        self.rows = []            # Pooled row widgets
+        self.items = {}           # index -> loaded item
+        self.pending_pages = set()
+        self.total = 0
+        self.count_loaded = False
+        self.first = 0            # Index of the top visible row
+        self.generation = 0       # Bumped on every new source; stale results are dropped
+        self.page_fn = None
+        self.on_count = None
+        self.jobs = queue.Queue()     # (generation, job) run one at a time on the worker
+        self.results = queue.Queue()
+        threading.Thread(target=self._work, daemon=True).start()
+
+        self.viewport.bind("<Configure>", lambda e: self._refresh())
+        self._bind_wheel(self.viewport)
+        self._poll_id = self.after(50, self._poll)
+
+    # --- DATA ---
+    def set_source(self, count_fn, page_fn, on_count=None):
+        """count_fn() -> int and page_fn(offset, limit) -> list both run off the UI thread.
+        on_count(total) runs on the UI thread once the count is known."""
+        self.generation += 1
+        self.page_fn = page_fn
+        self.on_count = on_count
+        self.items.clear()
+        self.pending_pages.clear()
+        self.total, self.count_loaded, self.first = 0, False, 0
+
+        gen = self.generation
+        def job():
+            try:
+                self.results.put((gen, "count", count_fn()))
+            except Exception as e:
+                print(f"[UI] List count failed: {e}")
+        self.jobs.put((gen, job))
+        self._refresh()
+
+    def _request_page(self, page):
+        if page in self.pending_pages or self.page_fn is None: return
+        self.pending_pages.add(page)
+
+        gen, page_fn, size = self.generation, self.page_fn, self.page_size
+        def job():
+            try:
+                self.results.put((gen, "page", (page, page_fn(page * size, size))))
+            except Exception as e:
+                print(f"[UI] Page {page} failed: {e}")
+                self.results.put((gen, "failed", page))
+        self.jobs.put((gen, job))
+
+    def _work(self):
+        while True:
+            gen, job = self.jobs.get()
+            if job is None: return
+            if gen == self.generation: job()  # Pages of a replaced source are skipped
+
+    def _poll(self):
+        changed = False
+        while True:
+            try:
+                gen, kind, payload = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if gen != self.generation: continue
+            if kind == "count":
+                self.total, self.count_loaded = payload, True
+                if self.on_count: self.on_count(payload)
+            elif kind == "failed":
+                # Asked for again the next time one of its rows is drawn
+                self.pending_pages.discard(payload)
+                continue
+            else:
+                page, items = payload
+                for i, item in enumerate(items):
+                    self.items[page * self.page_size + i] = item
+            changed = True
+        if changed: self._refresh()
+        self._poll_id = self.after(50, self._poll)
+
+    # --- RENDERING ---
+    def _visible_count(self):
+        return max(1, self.viewport.winfo_height() // self.row_height + 1)
+
+    def _refresh(self):
+        visible = self._visible_count()
+        while len(self.rows) < visible:
+            row = self.create_row(self.viewport)
+            self._bind_wheel(row)
+            self.rows.append(row)
+
+        self.first = max(0, min(self.first, self.total - visible + 1))
+        for slot, row in enumerate(self.rows):
+            idx = self.first + slot
+            if slot >= visible or idx >= self.total:
+                row.place_forget()
+                continue
+            item = self.items.get(idx)
+            if item is None: self._request_page(idx // self.page_size)
+            self.fill_row(row, item)
+            row.place(x=0, y=slot * self.row_height, relwidth=1)
+
+        if self.count_loaded and self.total == 0:
+            self.empty_lbl.place(relx=0.5, rely=0.2, anchor="center")
+        else:
+            self.empty_lbl.place_forget()
+
+        if self.total > 0:
+            self.scrollbar.set(self.first / self.total, min(1.0, (self.first + visible - 1) / self.total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    # --- SCROLLING ---
+    def scroll_to(self, index):
+        self.first = int(index)
+        self._refresh()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(value) * self.total)
+        elif action == "scroll":
+            step = self._visible_count() - 1 if unit == "pages" else 1
+            self.scroll_to(self.first + int(value) * step)
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4: delta = -1
+        elif getattr(event, "num", None) == 5: delta = 1
+        else: delta = -1 if event.delta > 0 else 1
+        self.scroll_to(self.first + delta * 3)
+
+    def _bind_wheel(self, widget):
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            widget.bind(seq, self._on_wheel)
+
+    def destroy(self):
+        self.after_cancel(self._poll_id)
+        self.jobs.put((None, None))
+        super().destroy()
+
 # --- VOICE COMMANDER ---
 class VoiceCommander:
+    """
+    Screen-side handle on the shared speech worker. Every phrase goes through
+    one engine thread, so calls never overlap; speak() returns an Utterance
+    whose done callbacks fire when the phrase has actually been spoken.
+    """
     def __init__(self):
-        try:
-            self.engine = pyttsx3.init()
-            self.engine.setProperty('rate', 160)
-            voices = self.engine.getProperty('voices')
-            for v in voices:
-                if "Zira" in v.name or "female" in v.name.lower():
-                    self.engine.setProperty('voice', v.id)
-                    break
-        except:
-            print("Voice Engine Failed to Init")
-
-    def speak(self, text):
-        thread = threading.Thread(target=self._run_speech, args=(text,))
-        thread.start()
-
-    def _run_speech(self, text):
-        try:
-            self.engine.say(text)
-            self.engine.runAndWait()
-        except: pass
\ No newline at end of file
+        self.worker = speech.get_worker()
+
+    def speak(self, text, priority=speech.NORMAL, key=None, preempt=False, on_done=None):
+        return self.worker.say(text, priority, key, preempt, on_done)
+
+    def cancel(self, key=None):
+        self.worker.cancel(key)
+
+    def speak_stream(self, phrases, priority=speech.NORMAL, on_done=None):
+        """Speaks phrases from an iterator (e.g. brain.stream_phrases) in order, each
+        as soon as it arrives. Generation keeps running while a phrase is spoken.
+        on_done(completed) fires after the last phrase."""
+        stream_id = object()  # Phrases of one stream never coalesce with each other
+
+        def produce():
+            last = None
+            try:
+                for n, phrase in enumerate(phrases):
+                    last = self.worker.say(phrase, priority, key=(stream_id, n))
+            except Exception as e:
+                print(f"[VOICE] Stream failed: {e}")
+            if on_done is None: return
+            if last is None: on_done(False)
+            else: last.add_done_callback(on_done)
+
+        threading.Thread(target=produce, daemon=True).start()
\ No newline at end of file
@@ -7,16 +7,41 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 VIDEO_FOLDER = os.path.join(BASE_DIR, "Raw_video")
 SKELETON_FOLDER = os.path.join(BASE_DIR, "sck")
 MISTAKES_FOLDER = os.path.join(BASE_DIR, "mistakes")
+CUE_AUDIO_FOLDER = os.path.join(BASE_DIR, "cue_audio") # Pre-rendered coaching cues (python cue_audio.py)
+PREVIEW_FOLDER = os.path.join(BASE_DIR, "previews")    # Move thumbnails and preview clips
 
 # --- FILE PATHS ---
-PROFILE_FILE = os.path.join(BASE_DIR, "operator_profile.json")
-SESSION_STATS_PATH = os.path.join(BASE_DIR, "session_stats.json")
+PROFILE_FILE = os.path.join(BASE_DIR, "operator_profile.json") # Legacy single-operator file
+PROFILE_DB = os.path.join(BASE_DIR, "profiles.db")
+SESSION_DB = os.path.join(BASE_DIR, "sessions.db")
 BACKGROUND_IMAGE = os.path.join(BASE_DIR, "background.jpg")
+BENCH_BASELINE_FILE = os.path.join(BASE_DIR, "bench_baseline.json")
+LIBRARY_INDEX = os.path.join(BASE_DIR, "library.json") # Move library manifest (library.py)
 
 # --- SCRIPT PATHS ---
 LIVE_SCRIPT = os.path.join(BASE_DIR, "live.py")
 COACH_SCRIPT = os.path.join(BASE_DIR, "ai_coach.py")
 
+# --- TRACKING SETTINGS ---
+# "image" scores normalized 2D x/y. "world" scores MediaPipe's metric 3D world
+# landmarks (yaw-invariant, better for off-axis cameras); tapes need re-processing.
+SCORING_SPACE = "image"
+SCALE_NORMALIZE = True   # Measure poses in torso lengths (height / camera distance invariant)
+GROUP_PROCRUSTES = False # Ignore each body group's rotation and score its shape only (more forgiving)
+
+# --- AI COACH SERVER ---
+# brain.py --serve keeps the tip model loaded and answers on this local address
+BRAIN_ADDRESS = ("127.0.0.1", 6011)
+BRAIN_KEY_FILE = os.path.join(BASE_DIR, "brain.key")  # Per-install secret, created owner-only on first use
+TIP_CACHE_DB = os.path.join(BASE_DIR, "tips.db")
+
+# --- VOICE SETTINGS ---
+VOICE_RATE = 160       # Words per minute
+VOICE_HINT = "Zira"    # Preferred voice name (falls back to any female voice)
+LIVE_CORRECTIONS = True      # Speak corrections during the drill (live.py)
+LIVE_MIN_INTERVAL = 2.0      # Seconds between live corrections (a logged mistake's correction is exempt)
+LIVE_REPEAT_AFTER = 8.0      # Seconds before the same correction may be repeated
+
 # --- GAMIFICATION SETTINGS ---
 XP_PER_LEVEL = 500  # XP needed to level up
 
@@ -0,0 +1,139 @@
+import os
+import re
+import sys
+import time
+import wave
+import shutil
+import hashlib
+import subprocess
+import config
+
+# --- SETTINGS ---
+AUDIO_FORMAT = 1        # Bump to re-render every cue (e.g. after changing how files are made)
+RENDER_CHUNK = 50       # Phrases queued on the engine per runAndWait
+POLL_INTERVAL = 0.02    # Seconds between interrupt checks during playback
+
+# Renders are only valid for the voice that made them, so the voice settings
+# are part of the version key. Each version gets its own folder.
+VOICE_VERSION = hashlib.sha1(f"{AUDIO_FORMAT}|{config.VOICE_RATE}|{config.VOICE_HINT}".encode()).hexdigest()[:8]
+
+def segments(text):
+    """Splits text into the sentence-sized pieces cues are rendered and looked up by.
+    'At 3.2 seconds. Your left knee was too low.' -> ['At 3.2 seconds.', 'Your left knee was too low.']"""
+    return [s for s in re.split(r"(?<=[.!?:])\s+", text.strip()) if s]
+
+def normalize(text):
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+def cue_path(text, version=VOICE_VERSION):
+    """Content-addressed location of the rendered audio for text."""
+    digest = hashlib.sha1(f"{version}\0{normalize(text)}".encode()).hexdigest()[:16]
+    return os.path.join(config.CUE_AUDIO_FOLDER, version, f"{digest}.wav")
+
+# --- LOOKUP ---
+_rendered = None  # Filenames present in this version's folder, read once
+
+def lookup(text):
+    """Path of the pre-rendered audio for text, or None if it has to be synthesized live."""
+    global _rendered
+    if _player() is None: return None
+    if _rendered is None:
+        folder = os.path.join(config.CUE_AUDIO_FOLDER, VOICE_VERSION)
+        _rendered = set(os.listdir(folder)) if os.path.isdir(folder) else set()
+    path = cue_path(text)
+    return path if os.path.basename(path) in _rendered else None
+
+# --- PLAYBACK ---
+def _player():
+    """'winsound' on Windows, else a command-line WAV player, else None."""
+    if sys.platform == "win32": return "winsound"
+    for cmd in ("afplay", "aplay", "paplay"):
+        if shutil.which(cmd): return cmd
+    return None
+
+def wav_duration(path):
+    with wave.open(path, "rb") as w:
+        return w.getnframes() / float(w.getframerate())
+
+def play(path, interrupted=lambda: False):
+    """
+    Plays a rendered cue without touching the TTS engine. Blocks until it
+    ends; returns False if interrupted() turned true first (playback stops).
+    """
+    player = _player()
+    if player == "winsound":
+        import winsound
+        end = time.monotonic() + wav_duration(path)
+        winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC | winsound.SND_NODEFAULT)
+        while time.monotonic() < end:
+            if interrupted():
+                winsound.PlaySound(None, 0)
+                return False
+            time.sleep(POLL_INTERVAL)
+        return True
+
+    proc = subprocess.Popen([player, path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    while proc.poll() is None:
+        if interrupted():
+            proc.terminate()
+            return False
+        time.sleep(POLL_INTERVAL)
+    return proc.returncode == 0
+
+# --- OFFLINE RENDER ---
+def template_phrases():
+    """Every fixed sentence the coach says: translate_to_gym_slang's cues for
+    every joint and direction, plus the debrief advice lines."""
+    import ai_coach
+    from screens import ADVICE_RULES, DEFAULT_ADVICE
+
+    phrases = ["Also:"]
+    for text in ai_coach.cue_templates():
+        phrases += segments(text)
+    for _, advice in ADVICE_RULES:
+        phrases += segments(advice)
+    phrases += segments(DEFAULT_ADVICE)
+    return list(dict.fromkeys(phrases))
+
+def render(phrases):
+    """Renders the phrases that have no audio yet with pyttsx3.save_to_file.
+    Files are written under a temp name and renamed, so a crash never leaves
+    a half-written cue behind."""
+    import pyttsx3
+    global _rendered
+
+    phrases = list(dict.fromkeys(phrases))
+    todo = [p for p in phrases if not os.path.exists(cue_path(p))]
+    print(f"[VOICE] {len(todo)} cues to render ({len(phrases) - len(todo)} cached).")
+    if not todo: return 0
+    os.makedirs(os.path.dirname(cue_path(todo[0])), exist_ok=True)
+
+    engine = pyttsx3.init()
+    engine.setProperty('rate', config.VOICE_RATE)
+    for v in engine.getProperty('voices'):
+        if config.VOICE_HINT in v.name or "female" in v.name.lower():
+            engine.setProperty('voice', v.id)
+            break
+
+    for start in range(0, len(todo), RENDER_CHUNK):
+        chunk = todo[start:start + RENDER_CHUNK]
+        for phrase in chunk:
+            engine.save_to_file(phrase, f"{cue_path(phrase)}.tmp.wav")
+        engine.runAndWait()
+        for phrase in chunk:
+            tmp_path = f"{cue_path(phrase)}.tmp.wav"
+            if os.path.exists(tmp_path): os.replace(tmp_path, cue_path(phrase))
+        print(f"[VOICE] {min(start + RENDER_CHUNK, len(todo))}/{len(todo)}")
+    _rendered = None
+    return len(todo)
+
+def prune():
+    """Deletes renders made for other voice versions."""
+    if not os.path.isdir(config.CUE_AUDIO_FOLDER): return
+    for name in os.listdir(config.CUE_AUDIO_FOLDER):
+        if name != VOICE_VERSION:
+            shutil.rmtree(os.path.join(config.CUE_AUDIO_FOLDER, name), ignore_errors=True)
+
+if __name__ == "__main__":
+    prune()
+    render(template_phrases())
@@ -1,9 +1,12 @@
-import json
 import os
 import sys
 import subprocess
 from datetime import datetime
 import config
+import session_store
+import profile_store
+import library
+from session_result import SessionResult, session_log_path
 
 def load_or_create_profile(alias):
     # Default Profile with Game Stats
@@ -16,22 +19,19 @@ def load_or_create_profile(alias):
         "rank_title": config.RANKS[1]
     }
     
-    if os.path.exists(config.PROFILE_FILE):
-        try:
-            with open(config.PROFILE_FILE, 'r') as f:
-                data = json.load(f)
-                if data.get("alias") == alias:
-                    profile.update(data)
-        except: pass
+    stored = profile_store.get_store().load(alias)
+    if stored:
+        profile.update(stored)
     
-    # Ensure rank is synced
-    profile["rank_title"] = get_rank_title(profile["level"])
-    save_profile(profile)
+    # Ensure rank is synced (only write when something actually changed)
+    rank_title = get_rank_title(profile["level"])
+    if stored is None or stored.get("rank_title") != rank_title:
+        profile["rank_title"] = rank_title
+        save_profile(profile)
     return profile
 
-def save_profile(profile):
-    with open(config.PROFILE_FILE, "w") as f:
-        json.dump(profile, f)
+def save_profile(profile, flush=False):
+    profile_store.get_store().save(profile, flush=flush)
 
 def get_rank_title(level):
     # Find the highest rank less than or equal to current level
@@ -42,53 +42,54 @@ def get_rank_title(level):
             current_title = config.RANKS[lvl]
     return current_title
 
-def update_xp_from_session(profile, move_name):
-    if os.path.exists(config.SESSION_STATS_PATH):
-        try:
-            with open(config.SESSION_STATS_PATH, 'r') as f:
-                stats = json.load(f)
-            
-            xp_gained = stats.get("xp_gained", 0)
-            score = int(stats.get("avg_accuracy", 0))
-            
-            profile['xp'] += xp_gained
-            profile['total_sessions'] += 1
-            
-            # Update High Score
-            current_best = profile['high_scores'].get(move_name, 0)
-            if score > current_best:
-                profile['high_scores'][move_name] = score
-            
-            # Level Up Logic
-            # XP curve: Level * XP_PER_LEVEL (e.g., Lvl 1 needs 500, Lvl 2 needs 1000)
-            req_xp = profile['level'] * config.XP_PER_LEVEL
-            if profile['xp'] >= req_xp:
-                profile['level'] += 1
-                profile['xp'] = profile['xp'] - req_xp # Carry over excess XP
-                profile['rank_title'] = get_rank_title(profile['level'])
-            
-            save_profile(profile)
-            return xp_gained, score >= current_best  # Return if it was a new record
-        except Exception as e:
-            print(f"[LOGIC] XP Update Error: {e}")
+def update_xp_from_session(profile, move_name, result):
+    """Applies a SessionResult (from run_training_session) to the profile."""
+    if result is None: return 0, False
+    try:
+        xp_gained = result.xp_gained
+        score = int(result.avg_accuracy)
+        
+        profile['xp'] += xp_gained
+        profile['total_sessions'] += 1
+        
+        # Update High Score
+        current_best = profile['high_scores'].get(move_name, 0)
+        if score > current_best:
+            profile['high_scores'][move_name] = score
+        
+        # Level Up Logic
+        # XP curve: Level * XP_PER_LEVEL (e.g., Lvl 1 needs 500, Lvl 2 needs 1000)
+        req_xp = profile['level'] * config.XP_PER_LEVEL
+        if profile['xp'] >= req_xp:
+            profile['level'] += 1
+            profile['xp'] = profile['xp'] - req_xp # Carry over excess XP
+            profile['rank_title'] = get_rank_title(profile['level'])
+        
+        save_profile(profile, flush=True)  # Session results are written straight away
+        return xp_gained, score >= current_best  # Return if it was a new record
+    except Exception as e:
+        print(f"[LOGIC] XP Update Error: {e}")
     return 0, False
 
 def get_available_moves():
-    moves = {}
-    if not os.path.exists(config.VIDEO_FOLDER): return moves
-    
-    files = [f for f in os.listdir(config.VIDEO_FOLDER) if f.lower().endswith(('.mp4', '.avi'))]
-    for f in files:
-        name_parts = os.path.splitext(f)[0].split('_')
-        base = "_".join(name_parts[:-1]).upper() if len(name_parts) > 1 else os.path.splitext(f)[0].upper()
-        code = name_parts[-1] if len(name_parts) > 1 else 'c'
-        if base not in moves: moves[base] = {}
-        moves[base][code] = f
-    return moves
+    """{MOVE: {angle_code: video_filename}} from the library index (no folder scan unless it changed)."""
+    return {move: {code: e["video"] for code, e in angles.items()} for move, angles in library.get_moves().items()}
+
+def get_move_info(move_name):
+    """Library index entries for a move's angles: frame counts, duration, tape, thumbnail."""
+    return library.get_moves().get(move_name, {})
+
+def get_skeleton_path(video_filename):
+    return library.tape_path_for(video_filename)
 
 def check_skeleton_data(video_filename):
-    json_name = f"{os.path.splitext(video_filename)[0]}_coords.json"
-    return os.path.exists(os.path.join(config.SKELETON_FOLDER, json_name))
+    entry = library.get_entry(video_filename)
+    return bool(entry and entry["tape"])
+
+def get_fusion_tapes(angles, primary_code):
+    """Every available angle tape for a move, primary angle first."""
+    codes = [primary_code] + [c for c in angles if c != primary_code]
+    return [get_skeleton_path(angles[c]) for c in codes if c in angles and check_skeleton_data(angles[c])]
 
 def is_move_locked(move_name, current_level):
     """Returns (is_locked, required_level)"""
@@ -98,16 +99,42 @@ def is_move_locked(move_name, current_level):
                 return True, req_lvl
     return False, 0
 
-def run_training_session(json_path, target_log_path):
+def new_session_log_path():
+    """Unique per session, so concurrent drills on one machine never share a file."""
+    return session_log_path(config.MISTAKES_FOLDER)
+
+def run_training_session(json_path, target_log_path, move_name=None, alias=None):
+    """Runs the tracker and coach for one drill. Returns the SessionResult (None if the tracker wrote nothing).
+    json_path may be a list of angle tapes (primary first) for fused multi-angle scoring."""
+    if isinstance(json_path, (list, tuple)):
+        json_path = os.pathsep.join(json_path)
     print(f"[LOGIC] Running Tracker -> {target_log_path}")
     subprocess.run([sys.executable, config.LIVE_SCRIPT, json_path, target_log_path], check=False)
     
-    if os.path.exists(target_log_path):
-        print(f"[LOGIC] Running Coach...")
-        subprocess.run([sys.executable, config.COACH_SCRIPT, target_log_path], check=False)
+    if not os.path.exists(target_log_path): return None
+
+    result = SessionResult.load(target_log_path)
+    result.move_name, result.alias = move_name, alias
+    try:
+        result.save(target_log_path)  # The tracker doesn't know who trained what; the coach and reports read it here
+    except OSError as e:
+        print(f"[LOGIC] Could not tag session log: {e}")
+    try:
+        session_store.record_session(target_log_path, result.mistakes, move_name=move_name, alias=alias,
+                                     avg_accuracy=result.avg_accuracy, xp_gained=result.xp_gained)
+    except Exception as e:
+        print(f"[LOGIC] Session Store Error: {e}")
+
+    print(f"[LOGIC] Running Coach...")
+    subprocess.run([sys.executable, config.COACH_SCRIPT, target_log_path], check=False)
+    analysis_path = target_log_path.replace(".json", "_analysis.json")
+    if os.path.exists(analysis_path):
+        try:
+            session_store.attach_analysis(analysis_path)
+        except Exception as e:
+            print(f"[LOGIC] Session Store Error: {e}")
+    return result
 
 def get_latest_analysis():
-    if not os.path.exists(config.MISTAKES_FOLDER): return None
-    files = [os.path.join(config.MISTAKES_FOLDER, f) for f in os.listdir(config.MISTAKES_FOLDER) if f.endswith("_analysis.json")]
-    if not files: return None
-    return max(files, key=os.path.getmtime)
\ No newline at end of file
+    session_store.ensure_backfilled()
+    return session_store.get_latest_analysis_path()
\ No newline at end of file
@@ -1,7 +1,5 @@
 import customtkinter as ctk
-from PIL import Image
 import os
-from datetime import datetime
 
 import config
 import game_logic
@@ -37,6 +35,7 @@ class MorpheusTerminal(ctk.CTk):
         """Centralized resource loading with error handling."""
         try:
             if os.path.exists(config.BACKGROUND_IMAGE):
+                from PIL import Image
                 img = Image.open(config.BACKGROUND_IMAGE)
                 # Using high-quality resampling for a professional look
                 self.bg_image = ctk.CTkImage(
@@ -104,22 +103,21 @@ class MorpheusTerminal(ctk.CTk):
         
         self.withdraw() 
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        target_log = os.path.join(config.MISTAKES_FOLDER, f"log_{timestamp}.json")
+        target_log = game_logic.new_session_log_path()
         
         try:
             # Training logic execution
-            game_logic.run_training_session(json_path, target_log)
-            game_logic.update_xp_from_session(profile, move_name)
+            result = game_logic.run_training_session(json_path, target_log, move_name, profile.get('alias'))
+            game_logic.update_xp_from_session(profile, move_name, result)
         except Exception as e:
             print(f"[SYSTEM ERROR] Session Interrupted: {e}")
 
         self.deiconify() 
-        self.show_results_screen(profile, video_file)
+        self.show_results_screen(profile, video_file, target_log)
         
-    def show_results_screen(self, profile, video_file):
+    def show_results_screen(self, profile, video_file, session_log):
         """Post-Session: Data visualization and feedback."""
-        self.switch_frame(screens.ResultsScreen, profile=profile, video_file=video_file)
+        self.switch_frame(screens.ResultsScreen, profile=profile, video_file=video_file, session_log=session_log)
     
     # In interface.py inside class MorpheusTerminal:
 
@@ -0,0 +1,183 @@
+import os
+import json
+import hashlib
+import threading
+import config
+import storage
+
+# cv2 is only imported to probe videos that are new or changed since the last build.
+
+# --- SETTINGS ---
+MANIFEST_VERSION = 2
+VIDEO_EXTENSIONS = ('.mp4', '.avi')
+TAPE_FPS = 30  # Frame timing for tapes recorded without timestamp_ms
+
+WATCHED_FOLDERS = (config.VIDEO_FOLDER, config.SKELETON_FOLDER, config.PREVIEW_FOLDER)
+
+# --- NAMING ---
+def parse_video_name(filename):
+    """'punches_c.mp4' -> ('PUNCHES', 'c'). Names without an angle suffix are the front ('c') angle."""
+    name_parts = os.path.splitext(filename)[0].split('_')
+    base = "_".join(name_parts[:-1]).upper() if len(name_parts) > 1 else os.path.splitext(filename)[0].upper()
+    code = name_parts[-1] if len(name_parts) > 1 else 'c'
+    return base, code
+
+def tape_path_for(video_filename):
+    return os.path.join(config.SKELETON_FOLDER, f"{os.path.splitext(video_filename)[0]}_coords.json")
+
+def thumbnail_path_for(video_filename):
+    return os.path.join(config.PREVIEW_FOLDER, f"{os.path.splitext(video_filename)[0]}_thumb.jpg")
+
+def sprite_path_for(video_filename):
+    return os.path.join(config.PREVIEW_FOLDER, f"{os.path.splitext(video_filename)[0]}_sprite.jpg")
+
+def preview_path_for(video_filename):
+    return os.path.join(config.PREVIEW_FOLDER, f"{os.path.splitext(video_filename)[0]}_preview.mp4")
+
+# --- PROBES ---
+def _stat(path):
+    """(mtime, size) or None if the file is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime, st.st_size]
+
+def _probe_video(path):
+    import cv2
+    cap = cv2.VideoCapture(path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    finally:
+        cap.release()
+    return {"video_frames": frames, "fps": round(fps, 3), "duration_s": round(frames / fps, 2) if fps else None}
+
+def _probe_tape(path):
+    from scoring import load_tape_file
+    frames, phases = load_tape_file(path)
+    if not frames:
+        return {"tape_frames": 0, "tape_duration_s": 0, "embedded_phases": phases is not None}
+    first, last = frames[0].get('timestamp_ms'), frames[-1].get('timestamp_ms')
+    span_ms = (last - first) if first is not None and last is not None else (len(frames) - 1) * 1000 / TAPE_FPS
+    return {"tape_frames": len(frames), "tape_duration_s": round(span_ms / 1000, 2),
+            "embedded_phases": phases is not None}
+
+def _build_entry(video_file, previous=None):
+    """Manifest entry for one video. Probes are reused from previous while the files are unchanged."""
+    previous = previous or {}
+    video_path = os.path.join(config.VIDEO_FOLDER, video_file)
+    tape_path = tape_path_for(video_file)
+    entry = {"video": video_file, "video_stat": _stat(video_path), "tape_stat": _stat(tape_path)}
+
+    if entry["video_stat"] == previous.get("video_stat") and "video_frames" in previous:
+        entry.update({k: previous[k] for k in ("video_frames", "fps", "duration_s")})
+    else:
+        try:
+            entry.update(_probe_video(video_path))
+        except Exception as e:
+            print(f"[LIBRARY] Could not probe {video_file}: {e}")
+            entry.update({"video_frames": 0, "fps": 0, "duration_s": None})
+
+    entry["tape"] = tape_path if entry["tape_stat"] else None
+    if entry["tape"] and entry["tape_stat"] == previous.get("tape_stat") and "tape_frames" in previous:
+        entry.update({k: previous[k] for k in ("tape_frames", "tape_duration_s", "embedded_phases")})
+    elif entry["tape"]:
+        try:
+            entry.update(_probe_tape(tape_path))
+        except Exception as e:
+            print(f"[LIBRARY] Could not read {os.path.basename(tape_path)}: {e}")
+            entry["tape"] = None
+
+    # Made offline by previews.py
+    for key, path in (("thumbnail", thumbnail_path_for(video_file)), ("sprite", sprite_path_for(video_file)),
+                      ("preview", preview_path_for(video_file))):
+        entry[key] = path if os.path.exists(path) else None
+    return entry
+
+# --- MANIFEST ---
+def _folder_stamp():
+    """
+    One digest per watched folder over every file's name, mtime and size
+    (one scandir each). Folder mtimes alone miss a file rewritten in place,
+    e.g. a tape re-processed or still being written when it was probed.
+    """
+    stamp = []
+    for folder in WATCHED_FOLDERS:
+        if not os.path.isdir(folder):
+            stamp.append(None)
+            continue
+        digest = hashlib.sha1()
+        with os.scandir(folder) as it:
+            for e in sorted((e for e in it if e.is_file()), key=lambda e: e.name):
+                st = e.stat()
+                digest.update(f"{e.name}\0{st.st_mtime_ns}\0{st.st_size}\n".encode())
+        stamp.append(digest.hexdigest())
+    return stamp
+
+def build_manifest(previous=None):
+    """Scans the library folders once. Unchanged videos and tapes keep their earlier probes."""
+    previous_entries = {}
+    for angles in (previous or {}).get("moves", {}).values():
+        for entry in angles.values():
+            previous_entries[entry["video"]] = entry
+
+    stamp = _folder_stamp()
+    moves = {}
+    files = sorted(f for f in os.listdir(config.VIDEO_FOLDER) if f.lower().endswith(VIDEO_EXTENSIONS)) \
+        if os.path.isdir(config.VIDEO_FOLDER) else []
+    for f in files:
+        base, code = parse_video_name(f)
+        moves.setdefault(base, {})[code] = _build_entry(f, previous_entries.get(f))
+    return {"version": MANIFEST_VERSION, "stamp": stamp, "moves": moves}
+
+def load_manifest(path=None):
+    try:
+        with open(path or config.LIBRARY_INDEX, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+def save_manifest(manifest, path=None):
+    storage.write_json(path or config.LIBRARY_INDEX, manifest, indent=2)
+
+# --- SHARED INDEX ---
+_manifest = None
+_lock = threading.Lock()
+
+def get_library(refresh=False):
+    """
+    The library manifest, held in memory. Checking it costs one scandir per
+    watched folder; videos and tapes are only re-probed (and the manifest
+    file rewritten) when a file in them changed or refresh is set.
+    """
+    global _manifest
+    with _lock:
+        stamp = _folder_stamp()
+        if _manifest is None and not refresh:
+            _manifest = load_manifest()
+        if refresh or _manifest is None or _manifest["stamp"] != stamp:
+            _manifest = build_manifest(_manifest)
+            try:
+                save_manifest(_manifest)
+            except OSError as e:
+                print(f"[LIBRARY] Could not save index: {e}")
+        return _manifest
+
+def get_moves():
+    """{MOVE: {angle_code: entry}} with every angle's manifest entry."""
+    return get_library()["moves"]
+
+def get_entry(video_filename):
+    base, code = parse_video_name(video_filename)
+    entry = get_moves().get(base, {}).get(code)
+    return entry if entry and entry["video"] == video_filename else None
+
+if __name__ == "__main__":
+    moves = get_library(refresh=True)["moves"]
+    for move, angles in sorted(moves.items()):
+        for code, e in sorted(angles.items()):
+            tape = f"{e['tape_frames']} tape frames" if e["tape"] else "no tape"
+            print(f"{move:<20} {code:<3} {e['duration_s'] or 0:>6}s  {tape}")
+    print(f"[LIBRARY] {sum(len(a) for a in moves.values())} videos indexed -> {config.LIBRARY_INDEX}")
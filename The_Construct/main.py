@@ -1,20 +1,66 @@
-import customtkinter as ctk
-from interface import MorpheusTerminal
 import os
+import sys
+import time
+import subprocess
+
+_START = time.perf_counter()
 
 # --- CRITICAL FIX FOR FFMPEG CRASH ---
 # Forces OpenCV/FFmpeg to use a single thread, preventing the async_lock race condition.
 os.environ["OPENCV_FFMPEG_THREADS"] = "1"
 os.environ["OPENCV_VIDEOIO_PRIORITY_MSMF"] = "0" # Optional: Helps on Windows
 
-# ... rest of your code ...
+# --- STARTUP PROFILING ---
+# Modules that should never load before the login screen is up.
+HEAVY_MODULES = ["cv2", "PIL", "pyttsx3", "mediapipe", "numpy"]
+
+def import_time_breakdown(module="interface", top=15):
+    """
+    Imports `module` in a fresh interpreter with -X importtime and returns
+    (rows, loaded) where rows are the top-level imports sorted by cumulative
+    time as (cumulative_ms, self_ms, name) and loaded is every module seen.
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    rows, loaded = [], set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line: continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        except ValueError:
+            continue
+        loaded.add(name.strip().split(".")[0])
+        # Nested imports are indented under their parent; keep only top-level rows
+        if name.startswith(" ") and not name.startswith("  "):
+            rows.append((int(cum_us) / 1000, int(self_us) / 1000, name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top], loaded
+
+def print_startup_report(import_s, window_s):
+    rows, loaded = import_time_breakdown()
+    print("\n[STARTUP] ===== COLD START REPORT =====")
+    print(f"[STARTUP] UI modules imported : {import_s * 1000:8.1f} ms")
+    print(f"[STARTUP] Login screen ready  : {window_s * 1000:8.1f} ms")
+    print(f"[STARTUP] Top imports (-X importtime, fresh interpreter):")
+    for cum_ms, self_ms, name in rows:
+        print(f"[STARTUP]   {cum_ms:8.1f} ms cumulative {self_ms:8.1f} ms self  {name}")
+    eager = [m for m in HEAVY_MODULES if m in loaded]
+    print(f"[STARTUP] Heavy modules loaded at startup: {', '.join(eager) if eager else 'none'}")
 
 # --- ENTRY POINT ---
 if __name__ == "__main__":
+    startup_report = "--startup-report" in sys.argv
+
+    import customtkinter as ctk
+    from interface import MorpheusTerminal
+    imported_at = time.perf_counter()
+
     # Initialize the app theme settings
     ctk.set_appearance_mode("dark")
     ctk.set_default_color_theme("green")
     
     # Launch the main terminal
     app = MorpheusTerminal()
-    app.mainloop()
\ No newline at end of file
+    if startup_report:
+        app.after_idle(lambda: print_startup_report(imported_at - _START, time.perf_counter() - _START))
+    app.mainloop()
@@ -0,0 +1,149 @@
+import os
+import sys
+import cv2
+import numpy as np
+import config
+import library
+import storage
+
+# --- SETTINGS ---
+THUMB_SIZE = (320, 180)        # Hub card image
+SPRITE_FRAME_SIZE = (160, 90)  # One keyframe in the sprite strip
+SPRITE_FRAMES = 6              # Keyframes per sprite
+PREVIEW_SIZE = (480, 270)      # Briefing room clip
+PREVIEW_FPS = 15
+PREVIEW_MAX_SECONDS = 20
+PREVIEW_LEAD_SECONDS = 0.5     # Clip starts this long before the first action
+JPEG_QUALITY = 80
+
+def fit(frame, size):
+    """Letterboxes a BGR frame into size (w, h) without distorting it."""
+    w, h = size
+    fh, fw = frame.shape[:2]
+    scale = min(w / fw, h / fh)
+    nw, nh = max(1, int(fw * scale)), max(1, int(fh * scale))
+    canvas = np.zeros((h, w, 3), dtype=np.uint8)
+    x, y = (w - nw) // 2, (h - nh) // 2
+    canvas[y:y + nh, x:x + nw] = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_AREA)
+    return canvas
+
+# --- KEYFRAMES ---
+def keyframes(entry, count=SPRITE_FRAMES):
+    """
+    (thumbnail_frame, sprite_frames) as video frame indices. With a tape, the
+    sprite shows action phase boundaries and the thumbnail the middle of the
+    first action; without one, frames are spaced evenly.
+    """
+    total = entry["video_frames"]
+    if total <= 0: return 0, []
+
+    boundaries, middle = [], None
+    if entry["tape"]:
+        from scoring import load_tape_file
+        from visualizer import load_reference_phases
+        try:
+            frames, embedded = load_tape_file(entry["tape"])
+            phases = load_reference_phases(frames, entry["tape"], embedded)
+        except Exception as e:
+            print(f"[PREVIEW] No phases for {entry['video']}: {e}")
+            frames, phases = [], []
+        # Tape frame i is the video frame the processor stored with it
+        to_video = lambda i: frames[min(i, len(frames) - 1)].get('frame', i)
+        boundaries = sorted({to_video(i) for p in phases for i in (p["start_frame"], p["end_frame"])})
+        if phases:
+            first = min(phases, key=lambda p: p["start_frame"])
+            middle = to_video((first["start_frame"] + first["end_frame"]) // 2)
+
+    if len(boundaries) < 2:
+        boundaries = [int(total * (i + 0.5) / count) for i in range(count)]
+    if len(boundaries) > count:
+        boundaries = [boundaries[round(i * (len(boundaries) - 1) / (count - 1))] for i in range(count)]
+    boundaries = [min(b, total - 1) for b in boundaries]
+    thumb = middle if middle is not None else boundaries[len(boundaries) // 2]
+    return min(thumb, total - 1), boundaries
+
+# --- OUTPUT ---
+def _is_fresh(out_path, entry):
+    """True when out_path is newer than the video and tape it was made from."""
+    if not os.path.exists(out_path): return False
+    sources = [s[0] for s in (entry["video_stat"], entry.get("tape_stat")) if s]
+    return os.path.getmtime(out_path) >= max(sources, default=0)
+
+def _write_image(path, image):
+    ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok: raise ValueError(f"could not encode {os.path.basename(path)}")
+    with storage.atomic_write(path, 'wb') as f:
+        f.write(buf.tobytes())
+
+def generate(entry, force=False):
+    """
+    One sequential decode of the video makes its thumbnail, keyframe sprite
+    and low-res preview clip. Returns the paths written (empty when all
+    three were already up to date).
+    """
+    video_file = entry["video"]
+    thumb_path = library.thumbnail_path_for(video_file)
+    sprite_path = library.sprite_path_for(video_file)
+    preview_path = library.preview_path_for(video_file)
+    if not force and all(_is_fresh(p, entry) for p in (thumb_path, sprite_path, preview_path)):
+        return []
+
+    os.makedirs(config.PREVIEW_FOLDER, exist_ok=True)
+    thumb_frame, sprite_frames = keyframes(entry)
+    fps = entry["fps"] or 30
+    start = max(0, (sprite_frames[0] if sprite_frames else 0) - int(PREVIEW_LEAD_SECONDS * fps))
+    end = min(entry["video_frames"], start + int(PREVIEW_MAX_SECONDS * fps))
+    step = max(1, round(fps / PREVIEW_FPS))
+    last = max([thumb_frame, end - 1] + sprite_frames)
+
+    tmp_preview = f"{os.path.splitext(preview_path)[0]}.tmp.mp4"
+    writer = cv2.VideoWriter(tmp_preview, cv2.VideoWriter_fourcc(*"mp4v"), fps / step, PREVIEW_SIZE)
+    cap = cv2.VideoCapture(os.path.join(config.VIDEO_FOLDER, video_file))
+    thumb, sprite = None, {}
+    idx = 0
+    try:
+        while idx <= last:
+            ok, frame = cap.read()
+            if not ok: break
+            if idx == thumb_frame: thumb = fit(frame, THUMB_SIZE)
+            if idx in sprite_frames: sprite[idx] = fit(frame, SPRITE_FRAME_SIZE)
+            if start <= idx < end and (idx - start) % step == 0: writer.write(fit(frame, PREVIEW_SIZE))
+            idx += 1
+    finally:
+        cap.release()
+        writer.release()
+
+    written = []
+    if thumb is not None:
+        _write_image(thumb_path, thumb)
+        written.append(thumb_path)
+    if sprite:
+        _write_image(sprite_path, np.hstack([sprite[i] for i in sorted(sprite)]))
+        written.append(sprite_path)
+    if os.path.exists(tmp_preview) and os.path.getsize(tmp_preview) > 0:
+        os.replace(tmp_preview, preview_path)
+        written.append(preview_path)
+    elif os.path.exists(tmp_preview):
+        os.remove(tmp_preview)
+    return written
+
+def generate_all(force=False):
+    """Builds previews for every video in the library that is missing or out of date."""
+    moves = library.get_library(refresh=True)["moves"]
+    made = 0
+    for move, angles in sorted(moves.items()):
+        for code, entry in sorted(angles.items()):
+            try:
+                written = generate(entry, force)
+            except Exception as e:
+                print(f"[PREVIEW] {entry['video']} failed: {e}")
+                continue
+            if written:
+                made += 1
+                print(f"[PREVIEW] {entry['video']}: {len(written)} files")
+    library.get_library(refresh=True)  # Record the new paths in the index
+    print(f"[PREVIEW] {made} videos updated.")
+    return made
+
+if __name__ == "__main__":
+    generate_all(force="--force" in sys.argv)
@@ -1,9 +1,9 @@
 import cv2
-import json
 import os
 import sys
 import mediapipe as mp
 import subprocess
+import storage
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
 
@@ -55,6 +55,11 @@ with vision.PoseLandmarker.create_from_options(options) as landmarker:
                 frame_data['landmarks'].append({
                     'id': i, 'x': lm.x, 'y': lm.y, 'z': lm.z, 'v': lm.visibility
                 })
+        if result.pose_world_landmarks:
+            # Metric, hip-centered 3D points for world-space scoring (tracker space="world")
+            frame_data['world'] = [
+                {'id': i, 'x': lm.x, 'y': lm.y, 'z': lm.z} for i, lm in enumerate(result.pose_world_landmarks[0])
+            ]
         
         raw_coordinates.append(frame_data)
         
@@ -73,8 +78,8 @@ output_data = {
     "coordinates": raw_coordinates
 }
 
-with open(COORD_FILE, 'w') as f:
-    json.dump(output_data, f)
+# Written under a temp name and swapped in, so the library index never reads a half-written tape
+storage.write_json(COORD_FILE, output_data)
 
 print(f"\n[Success] Coordinates saved to {COORD_FILE}")
 
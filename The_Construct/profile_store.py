@@ -0,0 +1,129 @@
+import os
+import json
+import atexit
+import threading
+from datetime import datetime
+import config
+import storage
+
+# --- SETTINGS ---
+FLUSH_DELAY = 1.0  # Seconds to wait for more updates before writing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    alias TEXT PRIMARY KEY,
+    xp INTEGER NOT NULL DEFAULT 0,
+    level INTEGER NOT NULL DEFAULT 1,
+    total_sessions INTEGER NOT NULL DEFAULT 0,
+    rank_title TEXT,
+    high_scores TEXT NOT NULL DEFAULT '{}',
+    updated_at TEXT NOT NULL
+);
+"""
+
+COLUMNS = ["alias", "xp", "level", "total_sessions", "rank_title", "high_scores"]
+
+class ProfileStore:
+    """
+    Operator profiles keyed by alias in SQLite. Every write is a single
+    transaction, so a crash can never leave a half-written profile.
+    Repeated save() calls within FLUSH_DELAY are coalesced into one write;
+    save(profile, flush=True) writes straight away.
+    """
+    def __init__(self, db_path=None, legacy_file=None, flush_delay=FLUSH_DELAY):
+        self.db_path = db_path or config.PROFILE_DB
+        self.flush_delay = flush_delay
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # One flush at a time, so an older snapshot never lands last
+        self._dirty = {}      # alias -> latest profile not yet committed
+        self._timer = None
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+        self._migrate_legacy(legacy_file or config.PROFILE_FILE)
+
+    def _connect(self):
+        return storage.connect(self.db_path)
+
+    def _migrate_legacy(self, legacy_file):
+        """Imports the old single-operator operator_profile.json once."""
+        if not os.path.exists(legacy_file): return
+        try:
+            with open(legacy_file, 'r') as f:
+                data = json.load(f)
+            if data.get("alias") and self.load(data["alias"]) is None:
+                self._write([data])
+                print(f"[PROFILE] Imported legacy profile for {data['alias']}")
+        except Exception as e:
+            print(f"[PROFILE] Legacy import skipped: {e}")
+
+    # --- READS ---
+    def load(self, alias):
+        """Returns the operator's profile dict, or None if they have never logged in."""
+        with self._lock:
+            if alias in self._dirty:
+                return dict(self._dirty[alias])
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM profiles WHERE alias = ?", (alias,)).fetchone()
+        if row is None: return None
+        profile = dict(zip(COLUMNS, row))
+        profile["high_scores"] = json.loads(profile["high_scores"] or "{}")
+        return profile
+
+    def list_aliases(self):
+        with self._connect() as conn:
+            return [r[0] for r in conn.execute("SELECT alias FROM profiles ORDER BY updated_at DESC")]
+
+    # --- WRITES ---
+    def save(self, profile, flush=False):
+        """Queues the profile; it is written after FLUSH_DELAY (or on flush()).
+        flush writes it now, for changes that must survive a crash (session XP)."""
+        with self._lock:
+            self._dirty[profile["alias"]] = json.loads(json.dumps(profile))  # Snapshot
+            if self._timer is None and not flush:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush: self.flush()
+
+    def flush(self):
+        """
+        Writes every pending profile in one transaction. Profiles stay in the
+        pending set (and load() keeps returning them) until the write has
+        committed; one saved again in the meantime stays pending for the next flush.
+        """
+        with self._write_lock:
+            with self._lock:
+                pending = dict(self._dirty)
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not pending: return
+            self._write(pending.values())
+            with self._lock:
+                for alias, profile in pending.items():
+                    if self._dirty.get(alias) is profile: del self._dirty[alias]
+
+    def _write(self, profiles):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [(p["alias"], p.get("xp", 0), p.get("level", 1), p.get("total_sessions", 0),
+                 p.get("rank_title"), json.dumps(p.get("high_scores", {})), now) for p in profiles]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO profiles (alias, xp, level, total_sessions, rank_title, high_scores, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(alias) DO UPDATE SET xp = excluded.xp, "
+                "level = excluded.level, total_sessions = excluded.total_sessions, rank_title = excluded.rank_title, "
+                "high_scores = excluded.high_scores, updated_at = excluded.updated_at", rows)
+
+# --- SHARED INSTANCE ---
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ProfileStore()
+            atexit.register(_store.flush)
+        return _store
@@ -0,0 +1,322 @@
+import json
+import numpy as np
+
+# --- SCORING SETTINGS ---
+VIS_THRESHOLD = 0.5
+SEARCH_RADIUS = 10  # Frames searched either side of the current target
+TORSO_SMOOTHING = 0.1  # EMA factor for the live torso-length estimate
+MIN_TORSO = 1e-3       # Guards the scale division when shoulders/hips collapse
+
+# Weights & Groups
+WEIGHTS = {
+    'head_neck': 0.05, 'shoulders': 0.10, 'elbows': 0.10,
+    'wrists_hands': 0.15, 'torso_hips': 0.20, 'knees': 0.20, 'ankles_feet': 0.20
+}
+
+GROUPS = {
+    'head_neck': [0, 7, 8], 'shoulders': [11, 12], 'elbows': [13, 14],
+    'wrists_hands': [15, 16, 17, 18, 19, 20, 21, 22], 'torso_hips': [23, 24],
+    'knees': [25, 26], 'ankles_feet': [27, 28, 29, 30, 31, 32]
+}
+
+JOINT_NAMES = {
+    0: 'nose', 7: 'left ear', 8: 'right ear',
+    11: 'left shoulder', 12: 'right shoulder',
+    13: 'left elbow', 14: 'right elbow',
+    15: 'left wrist', 16: 'right wrist',
+    17: 'left pinky', 18: 'right pinky',
+    19: 'left index finger', 20: 'right index finger',
+    21: 'left thumb', 22: 'right thumb',
+    23: 'left hip', 24: 'right hip',
+    25: 'left knee', 26: 'right knee',
+    27: 'left ankle', 28: 'right ankle',
+    29: 'left heel', 30: 'right heel',
+    31: 'left toe', 32: 'right toe'
+}
+
+DIAG_TOP_K = 3  # Joints/groups recorded per stuck event
+WORLD_MIN_COVERAGE = 0.9  # Share of tape frames that need world landmarks for world-space scoring
+
+# --- TAPE LOADING ---
+def load_tape(json_path):
+    """Loads a reference tape and returns its list of frames."""
+    return load_tape_file(json_path)[0]
+
+def load_tape_file(json_path):
+    """Returns (frames, action_phases); phases are None unless the tape embeds them (test_video.py format)."""
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return data, None
+    return data.get('coordinates', data), data.get('action_phases')
+
+# --- FEATURES ---
+def get_full_body_features(landmarks, is_json=False):
+    points = np.array([[l['x'], l['y']] if is_json else [l.x, l.y] for l in landmarks])
+    hip_center = (points[23] + points[24]) / 2.0
+    return points - hip_center
+
+# --- WORLD (3D) FEATURES ---
+# MediaPipe world landmarks are metric, hip-centered, with y pointing down.
+def canonical_yaw(points):
+    """
+    Rotates hip-centered (..., 33, 3) points about the vertical axis so the
+    hip line (23 -> 24) points along +x. This removes which way the trainee
+    faces the camera, so the per-group cosine scores below become invariant
+    to yaw.
+    """
+    hip = points[..., 24, :] - points[..., 23, :]
+    angle = np.arctan2(hip[..., 2], hip[..., 0])[..., None]
+    c, s = np.cos(angle), np.sin(angle)
+    out = points.copy()
+    out[..., 0] = c * points[..., 0] + s * points[..., 2]
+    out[..., 2] = -s * points[..., 0] + c * points[..., 2]
+    return out
+
+def get_world_features(world_landmarks, is_json=False):
+    points = np.array([[l['x'], l['y'], l['z']] if is_json else [l.x, l.y, l.z] for l in world_landmarks])
+    hip_center = (points[23] + points[24]) / 2.0
+    return canonical_yaw(points - hip_center)
+
+def world_coverage(frames):
+    """Fraction of a tape's frames recorded with world landmarks (processor.py 'world' key)."""
+    return sum(1 for f in frames if f.get('world')) / len(frames) if frames else 0.0
+
+def has_world_landmarks(frames, min_coverage=WORLD_MIN_COVERAGE):
+    """True if enough of the tape has world landmarks to score in world space.
+    Frames without a detection are filled in by get_tape_world_features."""
+    return len(frames) > 0 and world_coverage(frames) >= min_coverage
+
+def get_tape_world_features(frames):
+    """
+    get_world_features for a whole tape in one pass. Returns a (frames, 33, 3)
+    array. Frames with no world landmarks are interpolated from the nearest
+    frames that have them (held at the start and end of the tape).
+    """
+    valid = np.array([bool(f.get('world')) for f in frames])
+    points = np.array([[[l['x'], l['y'], l['z']] for l in f['world']] for f in frames if f.get('world')])
+    if not valid.all():
+        known = np.flatnonzero(valid)
+        flat = points.reshape(len(known), -1)
+        points = np.stack([np.interp(np.arange(len(frames)), known, flat[:, c]) for c in range(flat.shape[1])],
+                          axis=1).reshape(len(frames), 33, 3)
+    points -= ((points[:, 23] + points[:, 24]) / 2.0)[:, None]
+    return canonical_yaw(points)
+
+def get_tape_features(frames):
+    """get_full_body_features for a whole tape in one pass. Returns a (frames, 33, 2) array."""
+    points = np.array([[[l['x'], l['y']] for l in f['landmarks']] for f in frames])
+    return points - ((points[:, 23] + points[:, 24]) / 2.0)[:, None]
+
+# --- SCALE NORMALIZATION ---
+def torso_length(points):
+    """Shoulder-center to hip-center distance for (..., 33, D) points."""
+    shoulders = (points[..., 11, :] + points[..., 12, :]) / 2.0
+    hips = (points[..., 23, :] + points[..., 24, :]) / 2.0
+    return np.linalg.norm(shoulders - hips, axis=-1)
+
+class FeatureExtractor:
+    """
+    Turns poses into the hip-centered arrays the scorer compares, in torso
+    lengths when normalize is on. That puts a short and a tall trainee, near
+    or far from the camera, on the same scale as the tape. Tapes are done in
+    one batch (scaled by their median torso); live frames one at a time
+    against a running torso estimate, so a single bad detection can't rescale
+    the pose.
+    """
+    def __init__(self, space="image", normalize=True, smoothing=TORSO_SMOOTHING):
+        self.space = space
+        self.normalize = normalize
+        self.smoothing = smoothing
+        self.reset()
+
+    def reset(self):
+        self.torso = None
+
+    def tape(self, frames):
+        points = get_tape_world_features(frames) if self.space == "world" else get_tape_features(frames)
+        if self.normalize:
+            points = points / max(float(np.median(torso_length(points))), MIN_TORSO)
+        return points
+
+    def live(self, landmarks, world_landmarks=None):
+        points = get_world_features(world_landmarks) if self.space == "world" else get_full_body_features(landmarks)
+        if self.normalize:
+            length = float(torso_length(points))
+            self.torso = length if self.torso is None else self.torso + self.smoothing * (length - self.torso)
+            points = points / max(self.torso, MIN_TORSO)
+        return points
+
+# --- SIMILARITY ---
+def evaluate_groups(curr_full, curr_rel, targ_rel):
+    total_weighted_score = 0
+    total_weight_used = 0
+    for group, indices in GROUPS.items():
+        visible_indices = [i for i in indices if curr_full[i].visibility > VIS_THRESHOLD]
+        if len(visible_indices) < 2: continue 
+        v1, v2 = curr_rel[visible_indices].flatten(), targ_rel[visible_indices].flatten()
+        norm1, norm2 = np.linalg.norm(v1), np.linalg.norm(v2)
+        sim = (np.dot(v1, v2) / (norm1 * norm2)) * 100 if (norm1 * norm2) != 0 else 0
+        total_weighted_score += sim * WEIGHTS[group]
+        total_weight_used += WEIGHTS[group]
+    return (total_weighted_score / total_weight_used) if total_weight_used > 0 else 0
+
+def search_window(curr_full, curr_rel, target_features, current_idx, radius=SEARCH_RADIUS):
+    """Scores the live pose against the tape frames around current_idx.
+    Returns (best_score, best_idx)."""
+    best_score, best_idx = 0, current_idx
+    start_s = max(0, current_idx - radius)
+    end_s = min(len(target_features), current_idx + radius)
+
+    for i in range(start_s, end_s):
+        score = evaluate_groups(curr_full, curr_rel, target_features[i])
+        if score > best_score:
+            best_score, best_idx = score, i
+    return best_score, best_idx
+
+# --- VECTORIZED SIMILARITY ---
+# Group membership as a (groups x 33) matrix so every group is scored in one matmul
+GROUP_NAMES = list(GROUPS.keys())
+GROUP_MATRIX = np.zeros((len(GROUPS), 33))
+for _g, _indices in enumerate(GROUPS.values()):
+    GROUP_MATRIX[_g, _indices] = 1.0
+WEIGHT_VECTOR = np.array([WEIGHTS[g] for g in GROUP_NAMES])
+JOINT_GROUP = GROUP_MATRIX.argmax(axis=0)   # Group index per landmark
+SCORED_JOINTS = GROUP_MATRIX.any(axis=0)    # Landmarks that belong to a group
+
+def get_visibility(landmarks):
+    return np.array([l.visibility for l in landmarks])
+
+def evaluate_groups_batch(curr_rel, visibility, targets, procrustes=False):
+    """
+    Same score as evaluate_groups, for any stack of target poses at once.
+    targets: (..., 33, D), e.g. (views, window, 33, 2); D is 3 for world features.
+    procrustes rotates each target group onto the live group (about the hip
+    center) before comparing, so only the group's shape is scored.
+    Returns scores with shape targets.shape[:-2].
+    """
+    sims, valid = group_similarities(curr_rel, visibility, targets, procrustes)
+    weights = WEIGHT_VECTOR * valid
+    if weights.sum() == 0:
+        return np.zeros(targets.shape[:-2])
+    return (sims * weights).sum(axis=-1) / weights.sum()
+
+def group_similarities(curr_rel, visibility, targets, procrustes=False):
+    """Per-group cosine scores (0-100) behind evaluate_groups_batch.
+    Returns (sims with shape targets.shape[:-2] + (G,), valid (G,) bool)."""
+    mask = GROUP_MATRIX * (visibility > VIS_THRESHOLD)          # (G, 33) visible joints per group
+    valid = mask.sum(axis=1) >= 2                               # Groups need 2+ visible joints
+    if procrustes:
+        dots = _aligned_dots(curr_rel, targets, mask)
+    else:
+        dots = (targets * curr_rel).sum(axis=-1) @ mask.T       # (..., G)
+    curr_sq = (curr_rel ** 2).sum(axis=-1) @ mask.T             # (G,)
+    targ_sq = (targets ** 2).sum(axis=-1) @ mask.T              # (..., G)
+    denom = np.sqrt(curr_sq * targ_sq)
+    sims = np.divide(dots, denom, out=np.zeros_like(dots), where=denom != 0) * 100
+    return sims, valid
+
+def _aligned_dots(curr_rel, targets, mask):
+    """
+    Per-group dot product after the best rotation of each target group onto
+    the live one (orthogonal Procrustes, no reflection). Closed form in 2D;
+    in 3D the sum of the cross-covariance singular values (Kabsch).
+    """
+    if curr_rel.shape[-1] == 2:
+        a = (targets * curr_rel).sum(axis=-1) @ mask.T
+        b = (targets[..., 0] * curr_rel[:, 1] - targets[..., 1] * curr_rel[:, 0]) @ mask.T
+        return np.sqrt(a ** 2 + b ** 2)
+
+    cov = np.einsum('gj,...jd,je->...gde', mask, targets, curr_rel)   # (..., G, 3, 3)
+    s = np.linalg.svd(cov, compute_uv=False)
+    s[..., -1] *= np.sign(np.linalg.det(cov))                          # Rule out mirror images
+    return s.sum(axis=-1)
+
+# --- DIAGNOSIS ---
+def diagnose(curr_rel, targ_rel, visibility, top_k=DIAG_TOP_K):
+    """
+    Ranks every visible grouped joint by its distance from the tape pose in
+    one array op. Returns (joints, groups), worst first:
+    joints = [{"joint_id", "group", "dx", "dy"[, "dz"], "error"}] with
+    deltas as live minus tape, groups = [{"group", "error"}] by mean joint error.
+    """
+    deltas = curr_rel - targ_rel                                # (33, D)
+    errors = np.linalg.norm(deltas, axis=-1)
+    usable = SCORED_JOINTS & (visibility > VIS_THRESHOLD)
+
+    ranked = np.argsort(np.where(usable, -errors, np.inf), kind="stable")[:min(top_k, int(usable.sum()))]
+    axes = ("dx", "dy", "dz")[:deltas.shape[-1]]
+    joints = [dict({"joint_id": int(j), "group": GROUP_NAMES[JOINT_GROUP[j]]},
+                   **{a: float(d) for a, d in zip(axes, deltas[j])}, error=float(errors[j])) for j in ranked]
+
+    counts = GROUP_MATRIX @ usable
+    group_err = np.divide(GROUP_MATRIX @ (errors * usable), counts, out=np.full(len(GROUP_NAMES), -1.0), where=counts > 0)
+    groups = [{"group": GROUP_NAMES[g], "error": float(group_err[g])}
+              for g in np.argsort(-group_err, kind="stable")[:top_k] if counts[g] > 0]
+    return joints, groups
+
+# --- MULTI-ANGLE FUSION ---
+def align_views(view_features, length=None):
+    """
+    Time-aligns several angle tapes of one move by normalized progress
+    (frame i of an N-frame view maps to i * (N-1)/(T-1)) and stacks them
+    into a (views, T, 33, 2) tensor. T defaults to the first (primary) view's length.
+    """
+    length = length or len(view_features[0])
+    stacked = []
+    for feats in view_features:
+        feats = np.asarray(feats)
+        idx = np.round(np.linspace(0, len(feats) - 1, length)).astype(int)
+        stacked.append(feats[idx])
+    return np.stack(stacked)
+
+def view_confidence(view_frames, length=None):
+    """Mean reference-landmark visibility per (view, aligned frame); tapes
+    without visibility values count as fully confident."""
+    length = length or len(view_frames[0])
+    conf = []
+    for frames in view_frames:
+        vis = np.array([np.mean([l.get('v', l.get('visibility', 1.0)) for l in f['landmarks']]) for f in frames])
+        idx = np.round(np.linspace(0, len(vis) - 1, length)).astype(int)
+        conf.append(vis[idx])
+    return np.stack(conf)
+
+def search_window_fused(curr_rel, visibility, target_stack, current_idx, confidence=None,
+                        mode="best", radius=SEARCH_RADIUS, procrustes=False, with_groups=False):
+    """
+    search_window over every view at once. mode "best" scores each frame by
+    its best-matching view; "blend" uses the confidence-weighted mean of all
+    views. Returns (best_score, best_idx, view) where view is the winning
+    view at best_idx (None for "blend"). with_groups appends the per-group
+    scores (0-100, NaN where a group isn't visible) behind best_score, taken
+    from the same pass.
+    """
+    start_s = max(0, current_idx - radius)
+    end_s = min(target_stack.shape[1], current_idx + radius)
+    sims, valid = group_similarities(curr_rel, visibility, target_stack[:, start_s:end_s], procrustes)  # (V, W, G)
+    weights = WEIGHT_VECTOR * valid
+    scores = (sims * weights).sum(axis=-1) / weights.sum() if weights.sum() else np.zeros(sims.shape[:-1])
+
+    if mode == "blend" and confidence is not None:
+        conf = confidence[:, start_s:end_s]
+        norm = np.maximum(conf.sum(axis=0), 1e-9)
+        per_frame = (scores * conf).sum(axis=0) / norm
+        views = None
+    else:
+        views = scores.argmax(axis=0)
+        per_frame = scores.max(axis=0)
+
+    best = int(per_frame.argmax()) if per_frame.size else 0
+    if per_frame.size == 0 or per_frame[best] <= 0:
+        result = (0, current_idx, None)
+    else:
+        result = (float(per_frame[best]), start_s + best, (int(views[best]) if views is not None else None))
+    if not with_groups: return result
+
+    if per_frame.size == 0:
+        groups = np.full(len(GROUP_NAMES), np.nan)
+    elif views is None:
+        groups = (sims[:, best] * conf[:, best, None]).sum(axis=0) / norm[best]
+    else:
+        groups = sims[views[best], best]
+    return result + (np.where(valid, groups, np.nan),)
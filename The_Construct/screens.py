@@ -1,13 +1,21 @@
 import customtkinter as ctk
-import cv2
-from PIL import Image, ImageTk
 import os
-import json
-import threading
-import time
+import queue
 import config
 import components
 import game_logic
+import session_store
+from session_result import SessionResult
+
+# Debrief advice per error keyword (first match wins). cue_audio.py pre-renders these lines.
+ADVICE_RULES = [
+    ("elbow", "Raise elbow to shield level."),
+    ("hands", "Keep guard up."),
+]
+DEFAULT_ADVICE = "Check form."
+
+DEBRIEF_POLL_MS = 50   # How often the debrief checks for speech/seek events
+SEEK_PREROLL = 30      # Tape frames shown before a mistake whose phase is unknown
 
 # --- HELPER: VIDEO BACKGROUND ENGINE ---
 class VideoBackgroundLabel(ctk.CTkLabel):
@@ -20,12 +28,15 @@ class VideoBackgroundLabel(ctk.CTkLabel):
         self.video_path = video_path
         self.target_width = width
         self.target_height = height
+        import cv2 # Deferred: only screens with video pay for OpenCV
         self.cap = cv2.VideoCapture(video_path)
         self.running = True
         self.update_video()
 
     def update_video(self):
         if not self.running: return
+        import cv2
+        from PIL import Image
         
         ret, frame = self.cap.read()
         if not ret:
@@ -197,6 +208,7 @@ class ScenarioHubScreen(ctk.CTkFrame):
 
     def _create_move_card(self, parent, name, angles, r, c):
         is_locked, req_lvl = game_logic.is_move_locked(name, self.profile['level'])
+        info = game_logic.get_move_info(name)  # Library index; no file access per card
         
         card = ModernCard(parent)
         card.grid(row=r, column=c, padx=10, pady=10, sticky="nsew")
@@ -208,9 +220,19 @@ class ScenarioHubScreen(ctk.CTkFrame):
         # Title
         display_name = name.replace("_", " ").upper()
         ctk.CTkLabel(card, text=display_name, font=("Roboto", 20, "bold"), text_color="white").pack(padx=15, pady=(0, 5), anchor="w")
+
+        # Preview still (front angle first), rendered offline by previews.py
+        thumb = next((info[k]["thumbnail"] for k in sorted(info, key=lambda k: k != 'c') if info[k]["thumbnail"]), None)
+        if thumb:
+            try:
+                ctk.CTkLabel(card, image=components.load_thumbnail(thumb, (320, 180)), text="").pack(padx=15, pady=(0, 5), anchor="w")
+            except Exception as e:
+                print(f"[UI] Thumbnail failed: {e}")
         
         # Details
-        sub_text = f"REQUIRED LEVEL: {req_lvl}" if is_locked else f"DATA STREAMS: {len(angles)}"
+        duration = max((e["duration_s"] or 0 for e in info.values()), default=0)
+        tapes = sum(1 for e in info.values() if e["tape"])
+        sub_text = f"REQUIRED LEVEL: {req_lvl}" if is_locked else f"DATA STREAMS: {len(angles)} | TAPES: {tapes} | {duration:.1f}s"
         ctk.CTkLabel(card, text=sub_text, font=("Roboto Mono", 10), text_color="gray").pack(padx=15, anchor="w")
 
         # Action Button
@@ -254,6 +276,11 @@ class BriefingRoomScreen(ctk.CTkFrame):
         ctk.CTkSegmentedButton(left_panel, values=human_angles, variable=self.selected_angle, 
                                selected_color="#0EA5E9", command=self._switch_angle).pack(padx=20, fill="x")
 
+        # Multi-angle fusion scores against every angle tape (needs 2+ tapes)
+        self.fusion_switch = ctk.CTkSwitch(left_panel, text="MULTI-ANGLE FUSION", font=("Roboto Mono", 11),
+                                           progress_color="#0EA5E9", command=self._update_start_button)
+        self.fusion_switch.pack(padx=20, pady=(20, 0), anchor="w")
+
         # Start Button at bottom
         self.start_btn = ctk.CTkButton(left_panel, text="START TRACKING", height=60, 
                                        font=("Roboto", 16, "bold"), fg_color="#10B981", hover_color="#059669",
@@ -277,14 +304,25 @@ class BriefingRoomScreen(ctk.CTkFrame):
             self.player.stop()
             self.player.destroy()
 
-        video_path = os.path.join(config.VIDEO_FOLDER, video_file)
+        # The low-res preview clip (previews.py) is far cheaper to decode than the master tape
+        entry = game_logic.get_move_info(self.move_name).get(code)
+        video_path = entry["preview"] if entry and entry["preview"] else os.path.join(config.VIDEO_FOLDER, video_file)
         self.player = components.VideoPlayer(self.video_container, width=800, height=500, video_path=video_path)
         self.player.pack(expand=True)
         self.player.play()
         
+        self.current_code = code
+        self._update_start_button()
+
+    def _update_start_button(self):
         # Activate Button Logic
+        code = self.current_code
+        video_file = self.angles.get(code)
         if game_logic.check_skeleton_data(video_file):
-             json_path = os.path.join(config.SKELETON_FOLDER, f"{os.path.splitext(video_file)[0]}_coords.json")
+             json_path = game_logic.get_skeleton_path(video_file)
+             if self.fusion_switch.get():
+                 tapes = game_logic.get_fusion_tapes(self.angles, code)
+                 if len(tapes) > 1: json_path = tapes
              self.start_btn.configure(state="normal", command=lambda: self.controller.launch_tracker(self.profile, video_file, json_path, self.move_name))
         else:
              self.start_btn.configure(state="disabled", text="DATA MISSING")
@@ -301,6 +339,7 @@ class ResultsScreen(ctk.CTkFrame):
         self.voice = components.VoiceCommander()
         self.mistakes = self._load_mistakes(session_log)
         self.debrief_active = False
+        self._debrief_poll_id = None
         
         # Top Header
         header = ctk.CTkFrame(self, fg_color="#1E293B", corner_radius=0, height=60)
@@ -326,6 +365,11 @@ class ResultsScreen(ctk.CTkFrame):
         video_path = os.path.join(config.VIDEO_FOLDER, video_file)
         self.review_player = components.VideoPlayer(right_panel, width=640, height=360, video_path=video_path)
         self.review_player.pack(pady=20)
+
+        # Score timeline from the session telemetry
+        self.score_chart = components.ScoreChart(right_panel, width=640, height=110)
+        self.score_chart.pack(padx=20)
+        self._plot_telemetry(session_log)
         
         # Coach Controls
         controls = ctk.CTkFrame(right_panel, fg_color="#0F172A")
@@ -344,10 +388,25 @@ class ResultsScreen(ctk.CTkFrame):
 
     def _load_mistakes(self, log_path):
         try:
-            with open(log_path, 'r') as f:
-                data = json.load(f)
-            return data.get("mistakes", [])
+            mistakes = SessionResult.load(log_path).mistakes
         except: return []
+        for m in mistakes:
+            # Tracker entries name the failed joint group rather than carrying an 'error' string
+            m.setdefault("error", m.get("failed_group", "form").replace("_", " ").upper())
+        return mistakes
+
+    def _plot_telemetry(self, log_path):
+        from telemetry import telemetry_path, load_telemetry  # numpy stays off the login path
+        try:
+            frames, _ = load_telemetry(telemetry_path(log_path))
+        except: frames = None
+        if frames is None or len(frames) == 0:
+            self.score_chart.plot([], [])
+            return
+        # Mistakes happen where the tracker was stuck on their frame_index
+        idx = frames["target_idx"].searchsorted([m.get("frame_index", 0) for m in self.mistakes])
+        markers = frames["t"][idx.clip(0, len(frames) - 1)]
+        self.score_chart.plot(frames["t"], frames["score"], markers)
 
     def _populate_list(self):
         if not self.mistakes:
@@ -360,48 +419,73 @@ class ResultsScreen(ctk.CTkFrame):
             m['ui_card'] = card # Store ref
             
             ctk.CTkLabel(card, text=f"{m['timestamp']}s | {m['error']}", font=("Roboto Mono", 11, "bold"), text_color="#F87171").pack(anchor="w", padx=10, pady=5)
+            if m.get('phase'):
+                ctk.CTkLabel(card, text=f"DURING: {m['phase'].upper()}", font=("Roboto Mono", 10), text_color="#0EA5E9").pack(anchor="w", padx=10)
             ctk.CTkLabel(card, text=self._get_advice(m['error']), font=("Arial", 11), text_color="#94A3B8", wraplength=280).pack(anchor="w", padx=10, pady=(0, 5))
 
     def _get_advice(self, error):
         # Quick map for advice text
-        if "elbow" in error.lower(): return "Raise elbow to shield level."
-        if "hands" in error.lower(): return "Keep guard up."
-        return "Check form."
+        for keyword, advice in ADVICE_RULES:
+            if keyword in error.lower(): return advice
+        return DEFAULT_ADVICE
 
     def start_voice_debrief(self):
         if self.debrief_active: return
         self.debrief_active = True
         self.btn_debrief.configure(state="disabled", text="COACHING IN PROGRESS...")
-        threading.Thread(target=self._run_coach_logic).start()
+        # Speech and seek callbacks only post events here; every widget change
+        # happens in _poll_debrief on the Tk loop.
+        self._debrief_events = queue.Queue()
+        self._debrief_step = -1
+        self._say(f"Analysis complete. Found {len(self.mistakes)} issues.")
+        self._poll_debrief()
+
+    def _say(self, text):
+        self.voice.speak(text, on_done=lambda completed: self._debrief_events.put("spoken"))
+
+    def _poll_debrief(self):
+        if not self.debrief_active: return
+        try:
+            while self.debrief_active:
+                event = self._debrief_events.get_nowait()
+                if event == "spoken": self._next_mistake()
+                elif event == "seeked": self._explain_mistake()
+        except queue.Empty:
+            pass
+        if self.debrief_active:
+            self._debrief_poll_id = self.after(DEBRIEF_POLL_MS, self._poll_debrief)
+
+    def _next_mistake(self):
+        """The previous cue has finished: move the highlight and the tape to the next mistake."""
+        if 0 <= self._debrief_step < len(self.mistakes):
+            self.mistakes[self._debrief_step]['ui_card'].configure(border_color="#334155", border_width=1)
+        self._debrief_step += 1
+        if self._debrief_step >= len(self.mistakes):
+            self._finish_debrief()
+            return
 
-    def _run_coach_logic(self):
-        self.voice.speak(f"Analysis complete. Found {len(self.mistakes)} issues.")
-        time.sleep(1)
+        m = self.mistakes[self._debrief_step]
+        m['ui_card'].configure(border_color="#0EA5E9", border_width=2)
+        self.status_lbl.configure(text=f"REVIEWING: {m['error'].upper()}")
+        # frame_index is the tape frame the trainee was stuck on; show the phase leading into it
+        frame = m.get('frame_index', 0)
+        start = m['phase_frames'][0] if m.get('phase_frames') else frame - SEEK_PREROLL
+        self.review_player.seek(max(0, start), on_ready=lambda: self._debrief_events.put("seeked"))
 
-        for m in self.mistakes:
-            if not self.debrief_active: break
-            
-            # Highlight UI
-            m['ui_card'].configure(border_color="#0EA5E9", border_width=2)
-            self.status_lbl.configure(text=f"REVIEWING: {m['error'].upper()}")
-            
-            # Seek Video
-            target = max(0, float(m['timestamp']) * 30 - 30) # Approx frame conversion
-            self.review_player.seek(int(target))
-            
-            # Speak
-            advice = self._get_advice(m['error'])
-            self.voice.speak(f"At {m['timestamp']} seconds. {advice}")
-            
-            time.sleep(4)
-            m['ui_card'].configure(border_color="#334155", border_width=1)
+    def _explain_mistake(self):
+        m = self.mistakes[self._debrief_step]
+        seconds = m.get('frame_index', 0) / self.review_player.fps
+        self._say(f"At {seconds:.1f} seconds. {self._get_advice(m['error'])}")
 
+    def _finish_debrief(self):
         self.status_lbl.configure(text="DEBRIEF COMPLETE")
         self.btn_debrief.configure(state="normal", text="REPLAY DEBRIEF")
         self.debrief_active = False
 
     def cleanup(self):
         self.debrief_active = False
+        self.voice.cancel()
+        if self._debrief_poll_id: self.after_cancel(self._debrief_poll_id)
         if self.review_player: self.review_player.stop()
         
 # --- UPDATE: DASHBOARD SCREEN ---
@@ -454,6 +538,10 @@ class DashboardScreen(ctk.CTkFrame):
 
 # --- NEW: HISTORY SCREEN ---
 class HistoryScreen(ctk.CTkFrame):
+    ROW_HEIGHT = 60
+    ALL_MOVES = "ALL MOVES"
+    ALL_GRADES = "ALL"
+
     def __init__(self, parent, controller, profile):
         super().__init__(parent, fg_color="#0F172A")
         
@@ -464,50 +552,77 @@ class HistoryScreen(ctk.CTkFrame):
                       command=lambda: controller.show_home_screen(profile)).pack(side="left", padx=20)
         ctk.CTkLabel(header, text="MISSION ARCHIVES", font=("Roboto", 18, "bold"), text_color="white").pack(side="left", padx=10)
 
-        # Scrollable List
-        scroll = ctk.CTkScrollableFrame(self, fg_color="transparent")
-        scroll.pack(fill="both", expand=True, padx=40, pady=20)
-
-        # Load logs from 'mistakes' folder
-        import glob
-        log_files = sorted(glob.glob(os.path.join(config.MISTAKES_FOLDER, "log_*.json")), reverse=True)
-
-        if not log_files:
-            ctk.CTkLabel(scroll, text="NO MISSION DATA FOUND", font=("Roboto Mono", 14), text_color="gray").pack(pady=50)
-        else:
-            for log in log_files:
-                self._create_log_entry(scroll, log)
-
-    def _create_log_entry(self, parent, log_path):
-        try:
-            with open(log_path, 'r') as f:
-                data = json.load(f)
-            
-            # Extract data safely
-            date_str = os.path.basename(log_path).replace("log_", "").replace(".json", "")
-            # Format: 20231020_120000 -> 2023-10-20 12:00
-            formatted_date = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:8]} {date_str[9:11]}:{date_str[11:13]}"
-            
-            mistake_count = len(data.get("mistakes", []))
-            grade = "S" if mistake_count == 0 else "A" if mistake_count < 3 else "B" if mistake_count < 6 else "F"
-            grade_color = "#10B981" if grade in ["S", "A"] else "#F59E0B" if grade == "B" else "#EF4444"
-
-            # UI Card
-            card = ctk.CTkFrame(parent, fg_color="#1E293B", corner_radius=10)
-            card.pack(fill="x", pady=5)
+        # Filters
+        filters = ctk.CTkFrame(self, fg_color="transparent")
+        filters.pack(fill="x", padx=40, pady=(20, 0))
+        self.known_moves = []
+        self.move_filter = ctk.StringVar(value=self.ALL_MOVES)
+        self.grade_filter = ctk.StringVar(value=self.ALL_GRADES)
+
+        ctk.CTkLabel(filters, text="MOVE", font=("Roboto Mono", 10), text_color="#94A3B8").pack(side="left", padx=(0, 10))
+        self.move_menu = ctk.CTkOptionMenu(filters, values=[self.ALL_MOVES], variable=self.move_filter, fg_color="#1E293B",
+                                           button_color="#334155", command=lambda _: self._reload())
+        self.move_menu.pack(side="left")
+        ctk.CTkLabel(filters, text="GRADE", font=("Roboto Mono", 10), text_color="#94A3B8").pack(side="left", padx=(30, 10))
+        ctk.CTkOptionMenu(filters, values=[self.ALL_GRADES, "S", "A", "B", "F"], variable=self.grade_filter, width=90,
+                          fg_color="#1E293B", button_color="#334155", command=lambda _: self._reload()).pack(side="left")
+
+        # Virtualized List: only the rows on screen exist as widgets
+        self.session_list = components.VirtualList(self, row_height=self.ROW_HEIGHT, create_row=self._create_row,
+                                           fill_row=self._fill_row, empty_text="NO MISSION DATA FOUND",
+                                           fg_color="transparent")
+        self.session_list.pack(fill="both", expand=True, padx=40, pady=20)
+        self._reload()
+
+    def _reload(self):
+        move = self.move_filter.get()
+        move = None if move == self.ALL_MOVES else move
+        grade = self.grade_filter.get()
+        grade = None if grade == self.ALL_GRADES else grade
+
+        def count():
+            # First open imports any old log files; later opens are a single indexed query
+            session_store.ensure_backfilled()
+            self.known_moves = session_store.list_moves()
+            return session_store.count_sessions(move_name=move, grade=grade)
+
+        self.session_list.set_source(count, lambda offset, limit: session_store.get_history(limit, offset, move, grade),
+                                     on_count=lambda total: self.move_menu.configure(values=[self.ALL_MOVES] + self.known_moves))
+
+    def _create_row(self, parent):
+        # UI Card (fixed height so rows can be recycled)
+        card = ctk.CTkFrame(parent, fg_color="#1E293B", corner_radius=10, height=self.ROW_HEIGHT - 10)
+        card.pack_propagate(False)
+
+        # Left: Date
+        card.date_lbl = ctk.CTkLabel(card, text="", font=("Roboto Mono", 12), text_color="gray", width=140, anchor="w")
+        card.date_lbl.pack(side="left", padx=15)
+        
+        # Right: Grade
+        card.grade_lbl = ctk.CTkLabel(card, text="", font=("Roboto", 16, "bold"))
+        card.grade_lbl.pack(side="right", padx=20)
+        
+        # Middle: Move & Summary
+        card.summary_lbl = ctk.CTkLabel(card, text="", font=("Roboto", 12, "bold"), text_color="white", anchor="w")
+        card.summary_lbl.pack(side="left", padx=20)
+        return card
+
+    def _fill_row(self, card, session):
+        if session is None:
+            card.date_lbl.configure(text="----------")
+            card.summary_lbl.configure(text="LOADING...")
+            card.grade_lbl.configure(text="", text_color="gray")
+            return
 
-            # Left: Date & ID
-            ctk.CTkLabel(card, text=formatted_date, font=("Roboto Mono", 12), text_color="gray").pack(side="left", padx=15)
-            
-            # Right: Grade
-            grade_lbl = ctk.CTkLabel(card, text=f"GRADE: {grade}", font=("Roboto", 16, "bold"), text_color=grade_color)
-            grade_lbl.pack(side="right", padx=20, pady=15)
-            
-            # Middle: Summary
-            ctk.CTkLabel(card, text=f"{mistake_count} ANOMALIES DETECTED", font=("Roboto", 12, "bold"), text_color="white").pack(side="left", padx=20)
+        # Format: 2023-10-20 12:00:00 -> 2023-10-20 12:00
+        formatted_date = session["started_at"][:16]
+        grade = session["grade"]
+        grade_color = "#10B981" if grade in ["S", "A"] else "#F59E0B" if grade == "B" else "#EF4444"
+        move = (session["move_name"] or "").replace("_", " ")
 
-        except Exception as e:
-            print(f"Error loading log {log_path}: {e}")
+        card.date_lbl.configure(text=formatted_date)
+        card.summary_lbl.configure(text=f"{move + '  //  ' if move else ''}{session['mistake_count']} ANOMALIES DETECTED")
+        card.grade_lbl.configure(text=f"GRADE: {grade}", text_color=grade_color)
 
 
 # --- NEW: SETTINGS SCREEN ---
@@ -0,0 +1,75 @@
+import os
+import json
+import uuid
+from datetime import datetime
+import storage
+
+class SessionResult:
+    """
+    Everything one drill produces: stats, the mistake log, and timing.
+    The tracker writes it once to a session-specific path (the log path the
+    app hands it), so there are no shared side files for sessions to clobber.
+    Per-frame telemetry lives in a binary file next to it (telemetry_path).
+    """
+    def __init__(self, session_id, tape_path=None, stats=None, mistakes=None, timing=None,
+                 move_name=None, alias=None, telemetry_path=None, phases=None):
+        self.session_id = session_id
+        self.tape_path = tape_path
+        self.stats = stats or {}
+        self.mistakes = mistakes or []
+        self.timing = timing or {}
+        self.move_name = move_name
+        self.alias = alias
+        self.telemetry_path = telemetry_path
+        self.phases = phases or []  # Trainee's own action phases, timed against the tape
+
+    @property
+    def xp_gained(self):
+        return self.stats.get("xp_gained", 0)
+
+    @property
+    def avg_accuracy(self):
+        return self.stats.get("avg_accuracy", 0)
+
+    def to_dict(self):
+        return {
+            "session_id": self.session_id,
+            "tape_path": self.tape_path,
+            "move_name": self.move_name,
+            "alias": self.alias,
+            "stats": self.stats,
+            "timing": self.timing,
+            "telemetry_path": self.telemetry_path,
+            "phases": self.phases,
+            "mistakes": self.mistakes
+        }
+
+    @classmethod
+    def from_dict(cls, data, session_id=None):
+        if isinstance(data, list):  # Older logs were a bare mistake list
+            return cls(session_id, mistakes=data)
+        return cls(data.get("session_id", session_id), data.get("tape_path"), data.get("stats"),
+                   data.get("mistakes"), data.get("timing"), data.get("move_name"), data.get("alias"),
+                   data.get("telemetry_path"), data.get("phases"))
+
+    # --- PERSISTENCE ---
+    def save(self, path):
+        """Atomic write: readers see either no file or the complete result."""
+        storage.write_json(path, self.to_dict(), indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls.from_dict(data, session_id_from_path(path))
+
+# --- NAMING ---
+def new_session_id():
+    """Timestamp for sorting plus a random suffix so two stations starting in the same second don't collide."""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+def session_log_path(folder, session_id=None):
+    return os.path.join(folder, f"log_{session_id or new_session_id()}.json")
+
+def session_id_from_path(path):
+    return os.path.splitext(os.path.basename(path))[0].replace("log_", "", 1)
@@ -0,0 +1,246 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+import config
+import storage
+
+# --- SCHEMA ---
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    log_path TEXT NOT NULL UNIQUE,
+    started_at TEXT NOT NULL,
+    alias TEXT,
+    move_name TEXT,
+    mistake_count INTEGER NOT NULL DEFAULT 0,
+    grade TEXT NOT NULL,
+    avg_accuracy REAL,
+    xp_gained INTEGER,
+    analysis_path TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_started ON sessions(started_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_move ON sessions(move_name, started_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_grade ON sessions(grade, started_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_analysis ON sessions(started_at) WHERE analysis_path IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS mistakes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    frame_index INTEGER,
+    timestamp TEXT,
+    joint_id INTEGER,
+    joint_group TEXT,
+    error TEXT,
+    wrong_x REAL, right_x REAL,
+    wrong_y REAL, right_y REAL,
+    score_at_fail INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_mistakes_session ON mistakes(session_id);
+CREATE INDEX IF NOT EXISTS idx_mistakes_group ON mistakes(joint_group);
+"""
+
+SESSION_COLUMNS = "id, log_path, started_at, alias, move_name, mistake_count, grade, avg_accuracy, xp_gained, analysis_path"
+
+_schema_ready = set()
+_backfill_lock = threading.Lock()
+_backfilled = False
+
+# --- CONNECTION ---
+@contextmanager
+def connect(db_path=None):
+    """Opens the store (WAL mode, schema ensured) and commits on success.
+    Connections are cheap, so each call (and each thread) gets its own."""
+    db_path = db_path or config.SESSION_DB
+    with storage.connect(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        if db_path not in _schema_ready:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            _schema_ready.add(db_path)
+        yield conn
+
+# --- HELPERS ---
+def grade_for(mistake_count):
+    return "S" if mistake_count == 0 else "A" if mistake_count < 3 else "B" if mistake_count < 6 else "F"
+
+def _started_at_from_path(log_path):
+    """log_20231020_120000.json -> '2023-10-20 12:00:00' (falls back to file mtime)."""
+    stem = os.path.splitext(os.path.basename(log_path))[0]
+    stem = stem.replace("_analysis", "").replace("log_", "")
+    try:
+        return datetime.strptime(stem[:15], "%Y%m%d_%H%M%S").strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        mtime = os.path.getmtime(log_path) if os.path.exists(log_path) else datetime.now().timestamp()
+        return datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")
+
+def _extract_mistakes(data):
+    """Accepts both log layouts: the tracker's bare list and the {"mistakes": [...]} form."""
+    if isinstance(data, dict):
+        return data.get("mistakes", [])
+    return data if isinstance(data, list) else []
+
+def _mistake_row(session_id, m):
+    return (
+        session_id, m.get("frame_index", m.get("frame")), m.get("timestamp", m.get("time")),
+        m.get("failed_joint_id"), m.get("failed_group", m.get("category")), m.get("error"),
+        m.get("wrong_x"), m.get("right_x"), m.get("wrong_y"), m.get("right_y"), m.get("score_at_fail")
+    )
+
+# --- WRITES ---
+def record_session(log_path, mistakes, started_at=None, alias=None, move_name=None,
+                   avg_accuracy=None, xp_gained=None, analysis_path=None, db_path=None):
+    """Inserts (or replaces) one session and its mistakes. Returns the session id."""
+    log_path = os.path.abspath(log_path)  # Stored absolute, so every lookup can find it
+    analysis_path = os.path.abspath(analysis_path) if analysis_path else None
+    started_at = started_at or _started_at_from_path(log_path)
+    with connect(db_path) as conn:
+        conn.execute("DELETE FROM sessions WHERE log_path = ?", (log_path,))
+        cur = conn.execute(
+            "INSERT INTO sessions (log_path, started_at, alias, move_name, mistake_count, grade, "
+            "avg_accuracy, xp_gained, analysis_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (log_path, started_at, alias, move_name, len(mistakes), grade_for(len(mistakes)),
+             avg_accuracy, xp_gained, analysis_path))
+        session_id = cur.lastrowid
+        conn.executemany("INSERT INTO mistakes (session_id, frame_index, timestamp, joint_id, joint_group, error, "
+                         "wrong_x, right_x, wrong_y, right_y, score_at_fail) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         [_mistake_row(session_id, m) for m in mistakes if isinstance(m, dict)])
+    return session_id
+
+def ingest_log(log_path, db_path=None, **meta):
+    """Reads a mistakes log from disk and records it."""
+    with open(log_path, 'r') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        stats = data.get("stats") or {}
+        meta.setdefault("move_name", data.get("move_name"))
+        meta.setdefault("alias", data.get("alias"))
+        meta.setdefault("avg_accuracy", stats.get("avg_accuracy"))
+        meta.setdefault("xp_gained", stats.get("xp_gained"))
+    return record_session(log_path, _extract_mistakes(data), db_path=db_path, **meta)
+
+def backfill(folder=None, db_path=None):
+    """Imports any log_*.json / *_analysis.json in the mistakes folder that the store
+    has not seen yet. Existing rows are never re-read. Returns the number imported."""
+    folder = folder or config.MISTAKES_FOLDER
+    if not os.path.exists(folder): return 0
+
+    with connect(db_path) as conn:
+        known = {os.path.abspath(r[0]) for r in conn.execute("SELECT log_path FROM sessions")}
+        known |= {os.path.abspath(r[0]) for r in
+                  conn.execute("SELECT analysis_path FROM sessions WHERE analysis_path IS NOT NULL")}
+
+    names = os.listdir(folder)
+    imported = 0
+    for name in sorted(n for n in names if n.startswith("log_") and n.endswith(".json") and not n.endswith("_analysis.json")):
+        path = os.path.abspath(os.path.join(folder, name))
+        if path in known: continue
+        try:
+            ingest_log(path, db_path=db_path)
+            imported += 1
+        except Exception as e:
+            print(f"[STORE] Skipping {name}: {e}")
+
+    for name in sorted(n for n in names if n.endswith("_analysis.json")):
+        path = os.path.abspath(os.path.join(folder, name))
+        if path in known: continue
+        try:
+            attach_analysis(path, db_path=db_path)
+            imported += 1
+        except Exception as e:
+            print(f"[STORE] Skipping {name}: {e}")
+    return imported
+
+def attach_analysis(analysis_path, db_path=None):
+    """Links an *_analysis.json to its session log (log_X_analysis.json -> log_X.json),
+    or records it as its own session when no log matches."""
+    analysis_path = os.path.abspath(analysis_path)
+    log_path = analysis_path[:-len("_analysis.json")] + ".json"
+    with connect(db_path) as conn:
+        cur = conn.execute("UPDATE sessions SET analysis_path = ? WHERE log_path = ?", (analysis_path, log_path))
+        if cur.rowcount: return
+    with open(analysis_path, 'r') as f:
+        mistakes = _extract_mistakes(json.load(f))
+    record_session(analysis_path, mistakes, analysis_path=analysis_path, db_path=db_path)
+
+def ensure_backfilled():
+    """Runs backfill() once per process; later calls are free."""
+    global _backfilled
+    with _backfill_lock:
+        if not _backfilled:
+            backfill()
+            _backfilled = True
+
+# --- QUERIES ---
+def _filters(move_name=None, grade=None):
+    clauses, params = [], []
+    if move_name:
+        clauses.append("move_name = ?")
+        params.append(move_name)
+    if grade:
+        clauses.append("grade = ?")
+        params.append(grade)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+def get_history(limit=50, offset=0, move_name=None, grade=None, db_path=None):
+    """Newest-first session summaries, optionally filtered by move and grade.
+    limit=None returns every matching session."""
+    where, params = _filters(move_name, grade)
+    limit = -1 if limit is None else limit
+    with connect(db_path) as conn:
+        rows = conn.execute(f"SELECT {SESSION_COLUMNS} FROM sessions{where} ORDER BY started_at DESC, id DESC "
+                            "LIMIT ? OFFSET ?", params + [limit, offset]).fetchall()
+    return [dict(r) for r in rows]
+
+def count_sessions(move_name=None, grade=None, db_path=None):
+    where, params = _filters(move_name, grade)
+    with connect(db_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM sessions{where}", params).fetchone()[0]
+
+def get_latest_session(with_analysis=False, db_path=None):
+    where = " WHERE analysis_path IS NOT NULL" if with_analysis else ""
+    with connect(db_path) as conn:
+        row = conn.execute(f"SELECT {SESSION_COLUMNS} FROM sessions{where} "
+                           "ORDER BY started_at DESC, id DESC LIMIT 1").fetchone()
+    return dict(row) if row else None
+
+def get_session_by_log(log_path, db_path=None):
+    with connect(db_path) as conn:
+        row = conn.execute(f"SELECT {SESSION_COLUMNS} FROM sessions WHERE log_path = ?",
+                           (os.path.abspath(log_path),)).fetchone()
+    return dict(row) if row else None
+
+def get_latest_analysis_path(db_path=None):
+    session = get_latest_session(with_analysis=True, db_path=db_path)
+    return session["analysis_path"] if session else None
+
+def get_session_mistakes(session_id, db_path=None):
+    with connect(db_path) as conn:
+        rows = conn.execute("SELECT * FROM mistakes WHERE session_id = ? ORDER BY id", (session_id,)).fetchall()
+    return [dict(r) for r in rows]
+
+def list_moves(db_path=None):
+    with connect(db_path) as conn:
+        return [r[0] for r in conn.execute(
+            "SELECT DISTINCT move_name FROM sessions WHERE move_name IS NOT NULL ORDER BY move_name")]
+
+def get_move_stats(move_name=None, db_path=None):
+    """Per-move aggregates: sessions, average mistakes/accuracy, last trained,
+    and the joint group that fails most often."""
+    where, params = _filters(move_name)
+    with connect(db_path) as conn:
+        rows = conn.execute(
+            f"SELECT move_name, COUNT(*) AS sessions, AVG(mistake_count) AS avg_mistakes, "
+            f"AVG(avg_accuracy) AS avg_accuracy, MAX(started_at) AS last_trained "
+            f"FROM sessions{where} GROUP BY move_name ORDER BY move_name", params).fetchall()
+        stats = [dict(r) for r in rows]
+        for s in stats:
+            worst = conn.execute(
+                "SELECT m.joint_group, COUNT(*) AS n FROM mistakes m JOIN sessions s ON s.id = m.session_id "
+                "WHERE s.move_name IS ? AND m.joint_group IS NOT NULL GROUP BY m.joint_group ORDER BY n DESC LIMIT 1",
+                (s["move_name"],)).fetchone()
+            s["worst_group"] = worst["joint_group"] if worst else None
+    return stats
@@ -0,0 +1,243 @@
+import time
+import heapq
+import itertools
+import threading
+import config
+import cue_audio
+
+# pyttsx3 is imported on the speech thread when the first utterance is queued.
+
+# --- PRIORITIES ---
+# Lower is sooner. Equal priorities are spoken in the order they were queued.
+URGENT = 0   # Live corrections
+NORMAL = 1   # Debrief narration
+LOW = 2      # Filler that can always wait
+
+class Utterance:
+    """
+    One queued phrase. Works like a small future: done callbacks receive
+    True if it was spoken to the end, False if it was cancelled, preempted
+    or no voice engine is available.
+    """
+    def __init__(self, text, priority, key):
+        self.text = text
+        self.priority = priority
+        self.key = key
+        self.state = "queued"   # queued -> speaking -> done / cancelled
+        self.completed = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def add_done_callback(self, callback):
+        """Runs callback(completed) when the utterance finishes (now, if it already has).
+        Callbacks run on the speech thread; Tk code should hop back with after()."""
+        if callback is None: return
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        _call(callback, self.completed)
+
+    def wait(self, timeout=None):
+        """Blocks until the utterance finishes. Returns whether it was spoken to the end."""
+        self._done.wait(timeout)
+        return self.completed
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def _finish(self, completed, state="done"):
+        with self._lock:
+            if self._done.is_set(): return
+            self.state = state
+            self.completed = completed
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks: _call(callback, completed)
+
+def _call(callback, completed):
+    try:
+        callback(completed)
+    except Exception as e:
+        print(f"[VOICE] Callback failed: {e}")
+
+class SpeechWorker:
+    """
+    A single thread owns the pyttsx3 engine and speaks a priority queue of
+    utterances, so overlapping requests wait their turn instead of racing
+    on the engine. Queueing a phrase that is already waiting (same key)
+    returns the waiting one instead of saying it twice. A preempting
+    utterance stops the current phrase at the next word boundary if it is
+    of equal or lower priority.
+    """
+    def __init__(self, rate=config.VOICE_RATE, voice_hint=config.VOICE_HINT):
+        self.rate = rate
+        self.voice_hint = voice_hint
+        self._cond = threading.Condition()
+        self._heap = []                # (priority, seq, utterance)
+        self._seq = itertools.count()
+        self._queued = {}              # key -> utterance still waiting
+        self._current = None
+        self._interrupt = False
+        self._thread = None
+
+    def say(self, text, priority=NORMAL, key=None, preempt=False, on_done=None):
+        """
+        Queues text and returns its Utterance. key (default: the text) is
+        what duplicates are matched on; a duplicate picks up the higher of
+        the two priorities and both callers' callbacks.
+        """
+        key = text if key is None else key
+        with self._cond:
+            utterance = self._queued.get(key)
+            if utterance is None:
+                utterance = Utterance(text, priority, key)
+                self._queued[key] = utterance
+                heapq.heappush(self._heap, (priority, next(self._seq), utterance))
+            elif priority < utterance.priority:
+                # Re-queued at the new priority; the stale heap entry is skipped when popped
+                utterance.priority = priority
+                heapq.heappush(self._heap, (priority, next(self._seq), utterance))
+
+            current = self._current
+            if preempt and current is not None and current.priority >= priority:
+                self._interrupt = True
+            self._start()
+            self._cond.notify()
+        utterance.add_done_callback(on_done)
+        return utterance
+
+    def cancel(self, key=None):
+        """Drops waiting utterances with this key (all of them when key is None)
+        and cuts off the current one if it matches."""
+        with self._cond:
+            dropped = [u for k, u in self._queued.items() if key is None or k == key]
+            for utterance in dropped:
+                del self._queued[utterance.key]
+                utterance.state = "cancelled"  # Under the lock, so _next skips its heap entry
+            if self._current is not None and (key is None or self._current.key == key):
+                self._interrupt = True
+        for utterance in dropped: utterance._finish(False, "cancelled")
+
+    def busy(self):
+        with self._cond:
+            return self._current is not None or bool(self._queued)
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _init_engine(self):
+        try:
+            import pyttsx3
+            engine = pyttsx3.init()
+            engine.setProperty('rate', self.rate)
+            for v in engine.getProperty('voices'):
+                if self.voice_hint in v.name or "female" in v.name.lower():
+                    engine.setProperty('voice', v.id)
+                    break
+            # Preemption: pyttsx3 can only be stopped safely from inside its own loop
+            engine.connect('started-word', lambda name, location, length: self._interrupt and engine.stop())
+            return engine
+        except Exception as e:
+            print(f"[VOICE] Voice Engine Failed to Init: {e}")
+            return None
+
+    def _next(self):
+        with self._cond:
+            while True:
+                while not self._heap: self._cond.wait()
+                priority, _, utterance = heapq.heappop(self._heap)
+                if utterance.state != "queued" or priority != utterance.priority: continue
+                if self._queued.get(utterance.key) is utterance: del self._queued[utterance.key]
+                utterance.state = "speaking"
+                self._current = utterance
+                self._interrupt = False
+                return utterance
+
+    def _speak(self, engine, text):
+        """Plays each sentence from the pre-rendered cue cache when it is there and
+        synthesizes the rest (timestamps, counts, LLM tips) live."""
+        for segment in cue_audio.segments(text):
+            if self._interrupt: return False
+            path = cue_audio.lookup(segment)
+            if path is not None:
+                try:
+                    if cue_audio.play(path, lambda: self._interrupt): continue
+                    if self._interrupt: return False
+                except Exception as e:
+                    print(f"[VOICE] Cue playback failed: {e}")
+            if engine is None: return False
+            engine.say(segment)
+            engine.runAndWait()
+        return True
+
+    def _run(self):
+        engine = self._init_engine()
+        while True:
+            utterance = self._next()
+            spoken = False
+            try:
+                spoken = self._speak(engine, utterance.text)
+            except Exception as e:
+                print(f"[VOICE] Speech failed: {e}")
+            with self._cond:
+                completed = spoken and not self._interrupt
+                self._current = None
+                self._interrupt = False
+            utterance._finish(completed)
+
+# --- LIVE CORRECTIONS ---
+class CueChannel:
+    """
+    Path for live corrections from the capture loop into the speech worker.
+    offer() never blocks: it drops the cue if another correction went out
+    less than min_interval ago or this one was said within repeat_after.
+    Cues offered with rate_limited=False skip the min_interval check (but
+    not the repeat check). Accepted cues are URGENT and preempt a stale
+    correction still playing.
+    """
+    def __init__(self, worker=None, min_interval=config.LIVE_MIN_INTERVAL,
+                 repeat_after=config.LIVE_REPEAT_AFTER, clock=time.monotonic):
+        self.worker = worker or get_worker()
+        self.min_interval = min_interval
+        self.repeat_after = repeat_after
+        self.clock = clock
+        self._last_sent = None
+        self._recent = {}  # text -> when it was last sent
+        self.sent = 0
+        self.dropped = 0
+
+    def offer(self, text, rate_limited=True):
+        """Queues text for speech unless rate limiting or dedup drops it. Returns whether it was queued."""
+        now = self.clock()
+        last_said = self._recent.get(text)
+        if ((rate_limited and self._last_sent is not None and now - self._last_sent < self.min_interval)
+                or (last_said is not None and now - last_said < self.repeat_after)):
+            self.dropped += 1
+            return False
+        self._last_sent = now
+        self._recent[text] = now
+        self.sent += 1
+        self.worker.say(text, URGENT, key=("live", text), preempt=True)
+        return True
+
+    def close(self):
+        """Silences corrections that are still waiting (e.g. when the drill ends)."""
+        for text in self._recent:
+            self.worker.cancel(("live", text))
+
+# --- SHARED INSTANCE ---
+_worker = None
+_worker_lock = threading.Lock()
+
+def get_worker():
+    """The process-wide speech worker; every voice in the app shares its one engine."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = SpeechWorker()
+        return _worker
@@ -0,0 +1,206 @@
+import os
+import time
+import argparse
+import threading
+from collections import deque
+import cv2
+import mediapipe as mp
+from mediapipe.tasks import python
+from mediapipe.tasks.python import vision
+
+import config
+from live import MODEL_PATH, TARGET_WIDTH, TARGET_HEIGHT, DummyCap, resize_and_pad, draw_guide, draw_score
+from tracker import TrackerEngine
+from session_result import SessionResult, session_log_path, session_id_from_path
+from telemetry import telemetry_path
+
+# --- CONFIGURATION ---
+IDLE_SLEEP = 0.002  # Worker back-off when no station has a fresh frame
+
+# --- CAPTURE ---
+class CaptureThread(threading.Thread):
+    """Reads one camera as fast as it delivers and keeps only the newest frame,
+    so a slow station never builds up a backlog."""
+    def __init__(self, source):
+        super().__init__(daemon=True)
+        self.source = source
+        self.cap = cv2.VideoCapture(source, cv2.CAP_DSHOW) if isinstance(source, int) else cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            print(f"[HOST] Camera {source} failed. Using black frames.")
+            self.cap = DummyCap()
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+        self._lock = threading.Lock()
+        self._frame = None
+        self.seq = 0
+        self.running = True
+
+    def run(self):
+        while self.running:
+            ret, frame = self.cap.read()
+            if not ret:
+                self.running = False
+                break
+            with self._lock:
+                self._frame = frame
+                self.seq += 1
+        self.cap.release()
+
+    def latest(self):
+        with self._lock:
+            return self.seq, self._frame
+
+    def stop(self):
+        self.running = False
+
+# --- STATION ---
+class Station:
+    """One trainee: a camera, its own landmarker and TrackerEngine, and its own log."""
+    def __init__(self, name, source, tape_path, log_path):
+        self.name = name
+        self.tape_path = tape_path
+        self.log_path = log_path
+        self.engine = TrackerEngine(tape_path, space=config.SCORING_SPACE, normalize=config.SCALE_NORMALIZE,
+                                    procrustes=config.GROUP_PROCRUSTES)
+        self.capture = CaptureThread(source)
+
+        base_options = python.BaseOptions(model_asset_path=MODEL_PATH)
+        options = vision.PoseLandmarkerOptions(base_options=base_options, running_mode=vision.RunningMode.VIDEO)
+        self.landmarker = vision.PoseLandmarker.create_from_options(options)
+
+        self.last_seq = 0
+        self.last_ts_ms = 0
+        self.display = None      # Latest annotated frame for the main thread to show
+        self.frames_done = 0
+        self.finished = False
+
+    def has_new_frame(self):
+        return not self.finished and self.capture.seq != self.last_seq
+
+    def step(self):
+        """Processes the newest frame. Only ever called by one worker at a time."""
+        seq, raw_frame = self.capture.latest()
+        if raw_frame is None or seq == self.last_seq: return
+        self.last_seq = seq
+
+        frame, _, _, _ = resize_and_pad(cv2.flip(raw_frame, 1), TARGET_WIDTH, TARGET_HEIGHT)
+        ghost_lms = self.engine.current_target_landmarks()
+        if ghost_lms: draw_guide(frame, ghost_lms)
+
+        # VIDEO mode needs strictly increasing timestamps per landmarker
+        ts_ms = max(int(time.time() * 1000), self.last_ts_ms + 1)
+        self.last_ts_ms = ts_ms
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        result = self.landmarker.detect_for_video(mp_image, ts_ms)
+
+        curr_full = result.pose_landmarks[0] if result.pose_landmarks else None
+        curr_world = result.pose_world_landmarks[0] if result.pose_world_landmarks else None
+        update = self.engine.process_frame(curr_full, world_landmarks=curr_world)
+        draw_score(frame, update["score"])
+        cv2.putText(frame, self.name, (TARGET_WIDTH - 200, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 65), 1)
+
+        self.display = frame
+        self.frames_done += 1
+        if self.engine.is_finished or not self.capture.running:
+            self.finished = True
+
+    def close(self):
+        self.capture.stop()
+        self.landmarker.close()
+        stats = self.engine.finish()
+        result = SessionResult(
+            session_id_from_path(self.log_path), tape_path=self.tape_path,
+            stats={k: stats[k] for k in ("xp_gained", "avg_accuracy", "frames_tracked")},
+            mistakes=stats["error_log"], timing=stats["timing"], phases=stats["phases"],
+            telemetry_path=stats["telemetry"].save(telemetry_path(self.log_path))
+        )
+        result.save(self.log_path)
+        return result
+
+# --- HOST ---
+class TrackerHost:
+    """
+    Runs N stations in one process. Inference workers take stations in
+    round-robin order, so every camera gets an equal share of CPU no matter
+    how fast it delivers frames. A station is never processed by two
+    workers at once (landmarkers are not thread-safe).
+    """
+    def __init__(self, stations, workers=None):
+        self.stations = stations
+        self.workers = workers or max(1, min(len(stations), (os.cpu_count() or 2) // 2))
+        self._queue = deque(range(len(stations)))
+        self._queue_lock = threading.Lock()
+        self._threads = []
+        self.running = False
+
+    def _next_station(self):
+        """Pops the first queued station with a fresh frame; others keep their place in line."""
+        with self._queue_lock:
+            for _ in range(len(self._queue)):
+                idx = self._queue.popleft()
+                if self.stations[idx].has_new_frame():
+                    return idx
+                self._queue.append(idx)
+        return None
+
+    def _worker(self):
+        while self.running:
+            idx = self._next_station()
+            if idx is None:
+                time.sleep(IDLE_SLEEP)
+                continue
+            try:
+                self.stations[idx].step()
+            except Exception as e:
+                print(f"[HOST] {self.stations[idx].name} error: {e}")
+            finally:
+                with self._queue_lock:
+                    self._queue.append(idx)  # Back of the line
+
+    def run(self):
+        """Blocks until every station finishes (or 'q'). Returns {station name: SessionResult}."""
+        for st in self.stations:
+            st.capture.start()
+            cv2.namedWindow(st.name, cv2.WINDOW_NORMAL)
+            cv2.resizeWindow(st.name, TARGET_WIDTH // 2, TARGET_HEIGHT // 2)
+
+        self.running = True
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for t in self._threads: t.start()
+        print(f"[HOST] {len(self.stations)} stations, {self.workers} inference workers")
+
+        # HighGUI calls stay on the main thread
+        while not all(st.finished for st in self.stations):
+            for st in self.stations:
+                if st.display is not None: cv2.imshow(st.name, st.display)
+                if not st.capture.running and st.capture.seq == st.last_seq: st.finished = True  # Camera/file ended
+            if cv2.waitKey(15) & 0xFF == ord('q'): break
+
+        self.running = False
+        for t in self._threads: t.join()
+        cv2.destroyAllWindows()
+
+        results = {}
+        for st in self.stations:
+            results[st.name] = st.close()
+            print(f"[HOST] {st.name}: {st.frames_done} frames, {len(results[st.name].mistakes)} mistakes -> {st.log_path}")
+        return results
+
+# --- CLI ---
+def parse_station(spec, index):
+    """'CAMERA:TAPE[:LOG]' -> Station. CAMERA is a device index or a video file/stream URL."""
+    parts = spec.split("::") if "::" in spec else spec.split(":", 2)
+    source = int(parts[0]) if parts[0].isdigit() else parts[0]
+    tape = parts[1]
+    log = parts[2] if len(parts) > 2 else session_log_path(config.MISTAKES_FOLDER)
+    return Station(f"STATION {index + 1}", source, tape, log)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tracks several trainees (one camera each) in one process.")
+    parser.add_argument("--station", action="append", required=True,
+                        help="CAMERA:TAPE[:LOG], e.g. 0:sck/punches_c_coords.json (use '::' as separator for paths with ':')")
+    parser.add_argument("--workers", type=int, help="Inference worker threads (default: one per station, capped at half the cores)")
+    args = parser.parse_args()
+
+    stations = [parse_station(spec, i) for i, spec in enumerate(args.station)]
+    TrackerHost(stations, args.workers).run()
@@ -0,0 +1,44 @@
+import os
+import json
+import sqlite3
+from contextlib import contextmanager
+
+# Shared file and database plumbing for the stores, logs and indexes.
+
+# --- ATOMIC FILES ---
+@contextmanager
+def atomic_write(path, mode='w'):
+    """
+    Yields a temp file next to path that replaces it only once the block
+    finishes, so readers see either the old file or the complete new one
+    (never a half-written one, even if the writer crashes).
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+
+def write_json(path, data, **dump_kwargs):
+    """json.dump through atomic_write. Returns path."""
+    with atomic_write(path) as f:
+        json.dump(data, f, **dump_kwargs)
+    return path
+
+# --- SQLITE ---
+@contextmanager
+def connect(db_path, timeout=5):
+    """One short-lived connection per call: commits on success, rolls back on error."""
+    conn = sqlite3.connect(db_path, timeout=timeout)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
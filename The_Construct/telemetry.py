@@ -0,0 +1,78 @@
+import os
+import numpy as np
+import storage
+from scoring import GROUP_NAMES
+
+# --- SETTINGS ---
+DEFAULT_CAPACITY = 4096  # Rows preallocated per session (~2 min at 30 FPS); grows by doubling
+
+# One row per processed camera frame. group_scores is NaN where a group had
+# too few visible joints (or nobody was in frame).
+FRAME_DTYPE = np.dtype([
+    ("t", "f8"),                                   # Seconds since the session started
+    ("target_idx", "i4"),
+    ("score", "f4"),
+    ("group_scores", "f4", (len(GROUP_NAMES),)),
+    ("frame_ms", "f4"),                            # Time since the previous frame (camera + detection + scoring)
+    ("process_ms", "f4"),                          # Time spent in TrackerEngine.process_frame
+    ("visibility", "f4"),                          # Mean landmark visibility, 0 when nobody was detected
+])
+
+class TelemetryRecorder:
+    """
+    Append-only per-frame record of a session. Rows go into a preallocated
+    structured array, so recording a frame is one row write with no
+    allocation. Nothing touches disk until save() at the end of the session.
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.buffer = np.zeros(capacity, dtype=FRAME_DTYPE)
+        self.count = 0
+
+    def record(self, t, target_idx, score, group_scores, frame_ms, process_ms, visibility):
+        if self.count == len(self.buffer):
+            self.buffer = np.concatenate([self.buffer, np.zeros(len(self.buffer), dtype=FRAME_DTYPE)])
+        self.buffer[self.count] = (t, target_idx, score, group_scores, frame_ms, process_ms, visibility)
+        self.count += 1
+
+    @property
+    def frames(self):
+        return self.buffer[:self.count]
+
+    def save(self, path):
+        """Writes the recorded rows as .npz (binary, no pickle), atomically."""
+        with storage.atomic_write(path, 'wb') as f:
+            np.savez_compressed(f, frames=self.frames, groups=np.array(GROUP_NAMES))
+        return path
+
+# --- LOADING ---
+def telemetry_path(log_path):
+    """log_<id>.json -> log_<id>_telemetry.npz next to it."""
+    return f"{os.path.splitext(log_path)[0]}_telemetry.npz"
+
+def load_telemetry(path):
+    """Returns (frames, group_names); frames is a FRAME_DTYPE structured array."""
+    with np.load(path, allow_pickle=False) as data:
+        return data["frames"], [str(g) for g in data["groups"]]
+
+# --- ANALYSIS ---
+def summarize(frames, group_names=GROUP_NAMES, segments=4):
+    """
+    Trend numbers for the coach: mean score per segment of the session
+    (start -> end), mean score per group, and the weakest group. Only frames
+    where someone was detected count.
+    """
+    seen = frames[frames["visibility"] > 0]
+    if len(seen) == 0:
+        return None
+    parts = np.array_split(seen["score"], min(segments, len(seen)))
+    finite = np.isfinite(seen["group_scores"])
+    counts = finite.sum(axis=0)
+    sums = np.where(finite, seen["group_scores"], 0).sum(axis=0)
+    groups = {g: round(float(s / c), 1) for g, s, c in zip(group_names, sums, counts) if c > 0}
+    return {
+        "segments": [round(float(p.mean()), 1) for p in parts],
+        "groups": groups,
+        "weakest_group": min(groups, key=groups.get) if groups else None,
+        "avg_frame_ms": round(float(seen["frame_ms"].mean()), 2),
+        "dropout": round(1 - len(seen) / len(frames), 3)
+    }
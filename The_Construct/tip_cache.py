@@ -0,0 +1,143 @@
+import re
+import time
+import atexit
+import threading
+from collections import OrderedDict
+import config
+import storage
+
+# --- SETTINGS ---
+MAX_TIPS = 2000  # Entries kept; least recently used tips are evicted beyond this
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tips (
+    joint TEXT NOT NULL,
+    issue TEXT NOT NULL,
+    version TEXT NOT NULL,
+    tip TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (joint, issue, version)
+);
+"""
+
+# The issue phrases ai_coach.translate_to_gym_slang builds cues from
+Y_ISSUES = ("too low", "too high")
+X_ISSUES = ("drifting right", "drifting left")
+FALLBACK_ISSUE = "out of alignment"
+
+def all_issues():
+    """Every issue phrase translate_to_gym_slang can produce."""
+    issues = [FALLBACK_ISSUE, *Y_ISSUES, *X_ISSUES]
+    issues += [f"{y} and {x}" for y in Y_ISSUES for x in X_ISSUES]
+    return issues
+
+def normalize(text):
+    """'The  Left Knee ' -> 'left knee', so equivalent inputs share a cache entry."""
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    return text[4:] if text.startswith("the ") else text
+
+class TipCache:
+    """
+    Coaching tips keyed by (joint, issue, prompt version) in SQLite, with
+    every entry for the current version held in memory. A lookup is a dict
+    access; the LLM only runs for inputs the cache has never seen. Entries
+    from older prompt versions are dropped when the cache opens.
+    """
+    def __init__(self, version, db_path=None, max_tips=MAX_TIPS):
+        self.version = version
+        self.db_path = db_path or config.TIP_CACHE_DB
+        self.max_tips = max_tips
+        self._lock = threading.Lock()
+        self._tips = OrderedDict()   # (joint, issue) -> tip, least recently used first
+        self._touched = {}           # (joint, issue) -> last_used not yet written
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            conn.execute("DELETE FROM tips WHERE version != ?", (version,))
+            rows = conn.execute("SELECT joint, issue, tip FROM tips WHERE version = ? ORDER BY last_used",
+                                (version,)).fetchall()
+        for joint, issue, tip in rows:
+            self._tips[(joint, issue)] = tip
+
+    def _connect(self):
+        return storage.connect(self.db_path)
+
+    def __len__(self):
+        return len(self._tips)
+
+    def get(self, joint, issue):
+        """The cached tip, or None."""
+        key = (normalize(joint), normalize(issue))
+        with self._lock:
+            tip = self._tips.get(key)
+            if tip is not None:
+                self._tips.move_to_end(key)
+                self._touched[key] = time.time()
+        return tip
+
+    def put_many(self, entries):
+        """Stores [((joint, issue), tip), ...] and evicts the least recently used beyond max_tips."""
+        now = time.time()
+        with self._lock:
+            rows = []
+            for (joint, issue), tip in entries:
+                key = (normalize(joint), normalize(issue))
+                self._tips[key] = tip
+                self._tips.move_to_end(key)
+                rows.append((*key, self.version, tip, now))
+            evicted = []
+            while len(self._tips) > self.max_tips:
+                evicted.append(self._tips.popitem(last=False)[0])
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO tips (joint, issue, version, tip, last_used) "
+                             "VALUES (?, ?, ?, ?, ?)", rows)
+            conn.executemany("DELETE FROM tips WHERE joint = ? AND issue = ? AND version = ?",
+                             [(*key, self.version) for key in evicted])
+
+    def put(self, joint, issue, tip):
+        self.put_many([((joint, issue), tip)])
+
+    def flush(self):
+        """Writes the recency of cache hits, so eviction order survives restarts."""
+        with self._lock:
+            touched = list(self._touched.items())
+            self._touched.clear()
+        if not touched: return
+        with self._connect() as conn:
+            conn.executemany("UPDATE tips SET last_used = ? WHERE joint = ? AND issue = ? AND version = ?",
+                             [(ts, *key, self.version) for key, ts in touched])
+
+    def missing(self, items):
+        """The (joint, issue) pairs in items with no cached tip, normalized and without duplicates."""
+        keys = dict.fromkeys((normalize(j), normalize(i)) for j, i in items)
+        with self._lock:
+            return [key for key in keys if key not in self._tips]
+
+# --- PREWARM ---
+def prewarm(cache, generate_many, joints=None, issues=None):
+    """
+    Fills the cache offline for every joint x issue combination that is not
+    in it yet. generate_many takes a list of (joint, issue) and returns tips.
+    """
+    from scoring import JOINT_NAMES
+    joints = joints or list(JOINT_NAMES.values())
+    issues = issues or all_issues()
+    todo = cache.missing([(j, i) for j in joints for i in issues])
+    print(f"[TIPS] {len(todo)} tips to generate ({len(cache)} cached).")
+    for start in range(0, len(todo), 25):
+        chunk = todo[start:start + 25]
+        cache.put_many(zip(chunk, generate_many(chunk)))
+        print(f"[TIPS] {min(start + 25, len(todo))}/{len(todo)}")
+    return len(todo)
+
+# --- SHARED INSTANCE ---
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache(version):
+    with _caches_lock:
+        if version not in _caches:
+            _caches[version] = TipCache(version)
+            atexit.register(_caches[version].flush)
+        return _caches[version]
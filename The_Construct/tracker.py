@@ -0,0 +1,276 @@
+import time
+import numpy as np
+from scoring import (GROUP_NAMES, FeatureExtractor, diagnose, load_tape_file, get_visibility, search_window_fused,
+                     align_views, view_confidence, has_world_landmarks, world_coverage)
+from telemetry import TelemetryRecorder
+from visualizer import PhaseTagger, PhaseIndex, StreamingSmoother, to_points, load_reference_phases, get_phase_index
+
+# --- TRACKING SETTINGS ---
+STUCK_TIMEOUT = 2.5    # Seconds without progress before a mistake is logged
+STUCK_SKIP = 20        # Frames skipped forward after a mistake
+CORRECTION_AFTER = 1.0 # Seconds without progress before the worst joint is called out live
+FINISH_MARGIN = 5      # Session ends this many frames before the tape ends
+NO_GROUP_SCORES = np.full(len(GROUP_NAMES), np.nan)
+PHASE_MATCH_WINDOW = 30  # Tape frames either side searched for the tape phase a live phase belongs to
+TAPE_FPS = 30            # Frame timing for tapes recorded without timestamp_ms
+
+def _phase_key(action):
+    """visualizer.py says "extending right hand", test_video.py "extending the right hand"."""
+    return action.replace("the ", "")
+
+def _is_view_list(source):
+    """True for a list of tapes (paths or frame lists), False for a single frame list."""
+    return isinstance(source, (list, tuple)) and len(source) > 0 and isinstance(source[0], (str, list))
+
+class TrackerEngine:
+    """
+    Tracks a trainee against a reference tape one pose at a time.
+    Has no camera, window, or file output, so it can run inside the CLI
+    (live.py), the desktop app, or the benchmarks.
+    """
+    def __init__(self, json_path=None, stuck_timeout=STUCK_TIMEOUT, fusion_mode="best", space="image",
+                 normalize=True, procrustes=False):
+        self.stuck_timeout = stuck_timeout
+        self.fusion_mode = fusion_mode  # "best" view per frame, or confidence-weighted "blend"
+        self.procrustes = procrustes    # Score group shape only, ignoring each group's rotation
+        self.configured_space = space   # What was asked for; load_reference decides per tape
+        self.extractor = FeatureExtractor(space, normalize)
+        self.target_data = []
+        self.target_features = []
+        self.target_stack = None        # (views, frames, 33, D); a single tape is one view
+        self.target_confidence = None
+        self.phase_index = PhaseIndex([])
+        self.reset()
+        if json_path:
+            self.load_reference(json_path)
+
+    # --- REFERENCE ---
+    def load_reference(self, source):
+        """
+        Loads a tape from a *_coords.json path (or an already-loaded frame list).
+        A list of paths loads every angle of a move for fused scoring; the
+        first one is the primary view that sets the timeline and the guide.
+        """
+        views = source if _is_view_list(source) else [source]
+        loaded = [load_tape_file(v) if isinstance(v, str) else (list(v), None) for v in views]
+        view_frames = [frames for frames, _ in loaded]
+
+        self.extractor.space = self.configured_space
+        if self.space == "world":
+            coverage = min(world_coverage(frames) for frames in view_frames)
+            if not all(has_world_landmarks(frames) for frames in view_frames):
+                print(f"[TRACKER] Only {coverage:.0%} of tape frames have world landmarks (re-run processor.py). "
+                      f"Scoring in image space.")
+                self.extractor.space = "image"
+            elif coverage < 1.0:
+                print(f"[TRACKER] World landmarks missing on {1 - coverage:.0%} of tape frames; "
+                      f"interpolating them from neighbouring frames.")
+
+        self.target_data = view_frames[0]
+        all_features = [self.extractor.tape(frames) for frames in view_frames]
+        self.target_features = all_features[0]
+        # Precomputed once so every frame (and every extra view) is one array op, not a Python loop
+        self.target_stack = align_views(all_features)
+        self.target_confidence = view_confidence(view_frames)
+        if isinstance(views[0], str):
+            self.phase_index = get_phase_index(views[0], self.target_data, loaded[0][1])
+        else:
+            self.phase_index = PhaseIndex(load_reference_phases(self.target_data))
+        self.reset()
+
+    @property
+    def space(self):
+        return self.extractor.space
+
+    @property
+    def units(self):
+        """What error-log coordinates are measured in."""
+        return "torso" if self.extractor.normalize else self.space
+
+    def reset(self, now=None):
+        self.current_target_idx = 0
+        self.last_advance_time = now if now is not None else time.time()
+        self.total_score_accumulated = 0
+        self.frames_tracked = 0
+        self.error_log = []
+        self.started_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.frames_processed = 0
+        self.processing_time = 0.0  # Seconds spent inside process_frame
+        self.current_view = 0
+        self.extractor.reset()
+        self.telemetry = TelemetryRecorder()
+        self._first_frame_at = None
+        self._last_frame_at = None
+        self.smoother = StreamingSmoother()
+        self.phase_tagger = PhaseTagger()
+        self.phase_log = []
+        self._corrected = False  # A live correction went out for the current stall
+
+    @property
+    def is_finished(self):
+        return self.current_target_idx >= len(self.target_data) - FINISH_MARGIN
+
+    def current_target_landmarks(self):
+        """Ghost pose for the guide overlay (None once the tape is done)."""
+        if self.current_target_idx < len(self.target_data):
+            return self.target_data[self.current_target_idx]['landmarks']
+        return None
+
+    # --- PER-FRAME ---
+    def process_frame(self, landmarks, now=None, world_landmarks=None):
+        """
+        Scores one detected pose (MediaPipe landmarks, or None when nobody is
+        in frame). World mode also needs the matching pose_world_landmarks.
+        Returns {"score", "target_idx", "events"} where events are "advance",
+        "stuck", "correction" and "phase" dicts; "stuck" carries the error-log
+        entry, "correction" the worst joint (as in diagnose) once the trainee
+        stalls, and "phase" a finished trainee phase timed against the tape.
+        """
+        now = now if now is not None else time.time()
+        tick = time.perf_counter()
+        self.frames_processed += 1
+        events = []
+        best_score = 0
+        if not landmarks or (self.space == "world" and not world_landmarks):
+            self._record(now, tick, 0, NO_GROUP_SCORES, 0)
+            events.extend(self._tag_phases(None))
+            return {"score": best_score, "target_idx": self.current_target_idx, "events": events}
+
+        curr_rel = self.extractor.live(landmarks, world_landmarks)
+        visibility = get_visibility(landmarks)
+        best_score, best_idx, view, group_scores = search_window_fused(
+            curr_rel, visibility, self.target_stack, self.current_target_idx,
+            self.target_confidence, self.fusion_mode, procrustes=self.procrustes, with_groups=True)
+        if view is not None: self.current_view = view
+
+        if best_idx > self.current_target_idx:
+            self.current_target_idx = best_idx
+            self.last_advance_time = now
+            self.total_score_accumulated += best_score
+            self.frames_tracked += 1
+            self._corrected = False
+            events.append({"type": "advance", "target_idx": best_idx, "score": best_score})
+        elif now - self.last_advance_time > self.stuck_timeout:
+            entry = self._log_stuck(visibility, curr_rel, best_score)
+            events.append({"type": "stuck", "entry": entry})
+            if entry["top_joints"]: events.append(self._correction(entry["top_joints"][0], logged=True))
+            self.current_target_idx = min(len(self.target_data) - 1, self.current_target_idx + STUCK_SKIP)
+            self.last_advance_time = now
+            self._corrected = False
+        elif not self._corrected and now - self.last_advance_time > CORRECTION_AFTER:
+            # Called out before the mistake is logged, so the trainee can still fix it
+            self._corrected = True
+            joints, _ = diagnose(curr_rel, self.target_stack[self.current_view, self.current_target_idx], visibility, 1)
+            if joints: events.append(self._correction(joints[0]))
+
+        self._record(now, tick, best_score, group_scores, visibility.mean())
+        events.extend(self._tag_phases(landmarks))
+        return {"score": best_score, "target_idx": self.current_target_idx, "events": events}
+
+    def _record(self, now, tick, score, group_scores, visibility):
+        elapsed = time.perf_counter() - tick
+        self.processing_time += elapsed
+        if self._first_frame_at is None: self._first_frame_at = now
+        frame_ms = (now - self._last_frame_at) * 1000 if self._last_frame_at is not None else 0
+        self._last_frame_at = now
+        self.telemetry.record(now - self._first_frame_at, self.current_target_idx, score, group_scores,
+                              frame_ms, elapsed * 1000, visibility)
+
+    # --- PHASES ---
+    def _tag_phases(self, landmarks):
+        """Streams the trainee's pose through the phase tagger (one step per processed
+        frame, like the telemetry rows) and times each finished phase against the tape."""
+        ended = self.phase_tagger.update(self.smoother.update(to_points(landmarks)))
+        events = []
+        for phase in ended:
+            entry = self._compare_phase(phase)
+            self.phase_log.append(entry)
+            events.append({"type": "phase", "phase": entry})
+        return events
+
+    def _tape_ms(self, idx):
+        frame = self.target_data[min(idx, len(self.target_data) - 1)]
+        return frame.get('timestamp_ms', idx * 1000 / TAPE_FPS)
+
+    def _compare_phase(self, phase):
+        """
+        Matches a live phase to the nearest tape phase with the same action
+        around where the trainee was on the tape. offset_ms is how far along
+        the tape they started versus where the tape starts it: positive is late.
+        """
+        frames = self.telemetry.frames
+        start, end = frames[phase["start_frame"]], frames[phase["end_frame"]]
+        target_idx = int(start["target_idx"])
+        entry = {
+            "action": phase["action"],
+            "start_t": round(float(start["t"]), 3),
+            "duration_ms": round(float(end["t"] - start["t"]) * 1000),
+            "target_idx": target_idx,
+            "ref_phase": None,
+            "offset_ms": None
+        }
+        key = _phase_key(phase["action"])
+        nearby = self.phase_index.overlapping(target_idx - PHASE_MATCH_WINDOW, target_idx + PHASE_MATCH_WINDOW)
+        candidates = [p for p in nearby
+                      if _phase_key(p["action"]) == key and abs(p["start_frame"] - target_idx) <= PHASE_MATCH_WINDOW]
+        if candidates:
+            ref = min(candidates, key=lambda p: abs(p["start_frame"] - target_idx))
+            entry["ref_phase"] = {"start_frame": ref["start_frame"], "end_frame": ref["end_frame"]}
+            entry["offset_ms"] = round(self._tape_ms(target_idx) - self._tape_ms(ref["start_frame"]))
+        return entry
+
+    def _correction(self, joint, logged=False):
+        """logged marks the correction that goes with a stuck entry (vs. the early CORRECTION_AFTER call-out)."""
+        return dict(joint, type="correction", target_idx=self.current_target_idx, units=self.units, logged=logged)
+
+    def _log_stuck(self, visibility, curr_rel, best_score):
+        targ_rel = self.target_stack[self.current_view, self.current_target_idx]
+        joints, groups = diagnose(curr_rel, targ_rel, visibility)
+        worst_landmark_idx = joints[0]["joint_id"] if joints else 24
+        worst_group = joints[0]["group"] if joints else "torso_hips"
+
+        entry = {
+            "frame_index": self.current_target_idx,
+            "timestamp": time.strftime("%H:%M:%S"),
+            "failed_joint_id": int(worst_landmark_idx),
+            "failed_group": worst_group,
+            "wrong_x": float(curr_rel[worst_landmark_idx][0]),
+            "right_x": float(targ_rel[worst_landmark_idx][0]),
+            "wrong_y": float(curr_rel[worst_landmark_idx][1]),
+            "right_y": float(targ_rel[worst_landmark_idx][1]),
+            "score_at_fail": int(best_score),
+            "units": self.units,
+            "top_joints": joints,
+            "top_groups": groups
+        }
+        phase = self.phase_index.phase_at(self.current_target_idx)
+        if phase:
+            entry["phase"] = phase["action"]
+            entry["phase_frames"] = [phase["start_frame"], phase["end_frame"]]
+        if self.space == "world":
+            entry["wrong_z"] = float(curr_rel[worst_landmark_idx][2])
+            entry["right_z"] = float(targ_rel[worst_landmark_idx][2])
+        if len(self.target_stack) > 1: entry["view"] = self.current_view
+        self.error_log.append(entry)
+        return entry
+
+    # --- END OF SESSION ---
+    def finish(self):
+        """Returns the session stats (same keys live.py has always saved), the error log, timing,
+        the trainee's timed phases and the per-frame TelemetryRecorder."""
+        avg = (self.total_score_accumulated / self.frames_tracked) if self.frames_tracked > 0 else 0
+        xp = int(avg * 0.5) + (len(self.target_data) // 10)
+        return {
+            "xp_gained": xp,
+            "avg_accuracy": round(avg, 1),
+            "frames_tracked": self.frames_tracked,
+            "error_log": list(self.error_log),
+            "timing": {
+                "started_at": self.started_at,
+                "ended_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "frames_processed": self.frames_processed,
+                "avg_frame_ms": round(self.processing_time * 1000 / self.frames_processed, 3) if self.frames_processed else 0
+            },
+            "phases": list(self.phase_log),
+            "telemetry": self.telemetry
+        }
@@ -2,6 +2,7 @@ import json
 import sys
 import numpy as np
 import os
+from bisect import bisect_left, bisect_right
 from collections import deque
 
 # --- CONFIGURATION ---
@@ -49,6 +50,185 @@ def smooth_data(frames, window_size):
         
     return smoothed_frames
 
+# --- PHASE DETECTION ---
+PHASE_LAG = 5  # Velocity is measured against the frame this many frames back
+
+JOINT_IDS = np.array(list(JOINTS))
+ANCHOR_IDS = np.array([info['anchor'] for info in JOINTS.values()])
+JOINT_LABELS = [info['name'] for info in JOINTS.values()]
+
+def to_points(landmarks):
+    """Tape landmarks (dicts) or MediaPipe landmarks -> (33, 2) x/y array; None if nobody was detected."""
+    if not landmarks: return None
+    if isinstance(landmarks[0], dict):
+        return np.array([[l['x'], l['y']] for l in landmarks])
+    return np.array([[l.x, l.y] for l in landmarks])
+
+class StreamingSmoother:
+    """smooth_data one frame at a time (same moving average, x/y only)."""
+    def __init__(self, window_size=SMOOTHING_WINDOW):
+        self.history = deque(maxlen=window_size)
+
+    def update(self, points):
+        if points is None: return None
+        self.history.append(points)
+        return sum(self.history) / len(self.history)
+
+class PhaseTagger:
+    """
+    The action state machine, fed one smoothed frame at a time. Each frame
+    costs O(joints) and only the last PHASE_LAG frames are kept, so it runs
+    on the live trainee as well as over a whole tape (detect_phases).
+    """
+    def __init__(self, debounce=DEBOUNCE_FRAMES):
+        self.debounce = debounce
+        self.history = deque(maxlen=PHASE_LAG + 1)
+        self.active_phases = {}
+        self.completed_phases = []
+        self.frame_idx = -1
+
+    def update(self, points):
+        """Feeds the next frame ((33, 2) points or None). Returns the phases that ended on it."""
+        self.frame_idx += 1
+        i = self.frame_idx
+        self.history.append(points)
+        prev = self.history[0]
+        if i < PHASE_LAG or points is None or prev is None:
+            return []
+
+        # Metrics for every tagged joint at once
+        curr_pos, prev_pos = points[JOINT_IDS], prev[JOINT_IDS]
+        velocity = np.linalg.norm(curr_pos - prev_pos, axis=1)
+        dist_curr = np.linalg.norm(curr_pos - points[ANCHOR_IDS], axis=1)
+        dist_prev = np.linalg.norm(prev_pos - prev[ANCHOR_IDS], axis=1)
+        extension_change = dist_curr - dist_prev
+        vertical_change = curr_pos[:, 1] - prev_pos[:, 1] # Y is down in image coords
+
+        ended = []
+        for k, name in enumerate(JOINT_LABELS):
+            action = None
+
+            # --- LOGIC TREE ---
+            if velocity[k] > MOVEMENT_THRESHOLD:
+                if extension_change[k] > 0.02: action = f"extending {name}"
+                elif extension_change[k] < -0.02: action = f"retracting {name}"
+                elif vertical_change[k] < -0.02: action = f"raising {name}"
+                elif vertical_change[k] > 0.02: action = f"lowering {name}"
+
+            # --- PHASE MANAGEMENT ---
+            current_active = self.active_phases.get(name)
+
+            if current_active is None:
+                if action:
+                    self.active_phases[name] = {"action": action, "start": i}
+            elif action != current_active['action']:
+                # Action ended or changed
+                duration = i - current_active['start']
+                if duration >= self.debounce:
+                    phase = {
+                        "action": current_active['action'],
+                        "start_frame": current_active['start'],
+                        "end_frame": i - 1,
+                        "duration": duration
+                    }
+                    self.completed_phases.append(phase)
+                    ended.append(phase)
+
+                if action:
+                    self.active_phases[name] = {"action": action, "start": i}
+                else:
+                    del self.active_phases[name]
+        return ended
+
+def detect_phases(clean_frames):
+    """Runs the action state machine over smoothed frames and returns the completed phases."""
+    tagger = PhaseTagger()
+    for frame in clean_frames:
+        tagger.update(to_points(frame['landmarks']))
+    return tagger.completed_phases
+
+def actions_path_for(json_path):
+    """sck/punches_c_coords.json -> sck/punches_c_actions.json"""
+    base = json_path[:-len("_coords.json")] if json_path.endswith("_coords.json") else os.path.splitext(json_path)[0]
+    return f"{base}_actions.json"
+
+def load_reference_phases(frames, json_path=None, embedded=None):
+    """
+    Action phases for a reference tape: the ones embedded in it, else the
+    <name>_actions.json next to it, else tagged now (and saved there so the
+    next load is a plain read).
+    """
+    if embedded is not None: return embedded
+    if not json_path:
+        return detect_phases(smooth_data(frames, SMOOTHING_WINDOW))
+
+    actions_path = actions_path_for(json_path)
+    if os.path.exists(actions_path) and os.path.getmtime(actions_path) >= os.path.getmtime(json_path):
+        try:
+            with open(actions_path, 'r') as f:
+                return json.load(f)["action_phases"]
+        except Exception as e:
+            print(f"[PHASES] Could not read {actions_path}: {e}")
+
+    phases = detect_phases(smooth_data(frames, SMOOTHING_WINDOW))
+    try:
+        with open(actions_path, 'w') as f:
+            json.dump({"source_coords": json_path, "action_phases": phases}, f, indent=4)
+    except OSError as e:
+        print(f"[PHASES] Could not cache phases: {e}")
+    return phases
+
+# --- PHASE INDEX ---
+class PhaseIndex:
+    """
+    Interval index over action_phases. Phases are sorted by start frame, with
+    a running maximum of end frames beside them. Both lists are monotonic, so
+    two bisects bound the only phases that can contain a frame (or overlap a
+    range), and the scan between them stays short.
+    """
+    def __init__(self, phases):
+        self.phases = sorted(phases, key=lambda p: (p['start_frame'], p['end_frame']))
+        self.starts = [p['start_frame'] for p in self.phases]
+        self.max_ends = []
+        running = float("-inf")
+        for p in self.phases:
+            running = max(running, p['end_frame'])
+            self.max_ends.append(running)
+
+    def __len__(self):
+        return len(self.phases)
+
+    def overlapping(self, start, end):
+        """Phases that share at least one frame with [start, end]."""
+        lo = bisect_left(self.max_ends, start)   # Everything before ends too early
+        hi = bisect_right(self.starts, end)      # Everything after starts too late
+        return [p for p in self.phases[lo:hi] if p['end_frame'] >= start]
+
+    def at(self, frame):
+        """Phases containing frame."""
+        return self.overlapping(frame, frame)
+
+    def phase_at(self, frame):
+        """The most recently started phase containing frame, or None."""
+        hits = self.at(frame)
+        return hits[-1] if hits else None
+
+_INDEX_CACHE = {}
+
+def get_phase_index(json_path, frames=None, embedded=None):
+    """PhaseIndex for a tape, cached per path until the tape file changes."""
+    key = (json_path, os.path.getmtime(json_path))
+    index = _INDEX_CACHE.get(json_path)
+    if index is None or index[0] != key:
+        if frames is None:
+            with open(json_path, 'r') as f:
+                data = json.load(f)
+            frames = data.get('coordinates', []) if isinstance(data, dict) else data
+            embedded = data.get('action_phases') if isinstance(data, dict) else None
+        index = (key, PhaseIndex(load_reference_phases(frames, json_path, embedded)))
+        _INDEX_CACHE[json_path] = index
+    return index[1]
+
 # --- MAIN ANALYSIS ---
 def analyze(json_path):
     print(f"Analyzing physics in: {json_path}")
@@ -60,69 +240,9 @@ def analyze(json_path):
     # 1. Apply Smoothing
     clean_frames = smooth_data(raw_frames, SMOOTHING_WINDOW)
     
-    active_phases = {}
-    completed_phases = []
+    # 2. Tag Phases
+    completed_phases = detect_phases(clean_frames)
     
-    # 2. Iterate Frames
-    for i in range(5, len(clean_frames)):
-        curr_frame = clean_frames[i]
-        prev_frame = clean_frames[i - 5] # Compare with 5 frames ago for velocity
-        
-        if not curr_frame['landmarks'] or not prev_frame['landmarks']:
-            continue
-            
-        c_lms = curr_frame['landmarks']
-        p_lms = prev_frame['landmarks']
-        
-        for idx, info in JOINTS.items():
-            # Get positions
-            curr_pos = np.array([c_lms[idx]['x'], c_lms[idx]['y']])
-            prev_pos = np.array([p_lms[idx]['x'], p_lms[idx]['y']])
-            
-            # Anchor (Shoulder/Hip) positions to detect relative movement (extension)
-            anchor_idx = info['anchor']
-            curr_anchor = np.array([c_lms[anchor_idx]['x'], c_lms[anchor_idx]['y']])
-            prev_anchor = np.array([p_lms[anchor_idx]['x'], p_lms[anchor_idx]['y']])
-            
-            # Metrics
-            velocity = np.linalg.norm(curr_pos - prev_pos)
-            dist_curr = np.linalg.norm(curr_pos - curr_anchor)
-            dist_prev = np.linalg.norm(prev_pos - prev_anchor)
-            extension_change = dist_curr - dist_prev
-            vertical_change = curr_pos[1] - prev_pos[1] # Y is down in image coords
-            
-            action = None
-            
-            # --- LOGIC TREE ---
-            if velocity > MOVEMENT_THRESHOLD:
-                if extension_change > 0.02: action = f"extending {info['name']}"
-                elif extension_change < -0.02: action = f"retracting {info['name']}"
-                elif vertical_change < -0.02: action = f"raising {info['name']}"
-                elif vertical_change > 0.02: action = f"lowering {info['name']}"
-                
-            # --- PHASE MANAGEMENT ---
-            current_active = active_phases.get(info['name'])
-            
-            if current_active is None:
-                if action:
-                    active_phases[info['name']] = {"action": action, "start": i}
-            else:
-                if action != current_active['action']:
-                    # Action ended or changed
-                    duration = i - current_active['start']
-                    if duration >= DEBOUNCE_FRAMES:
-                        completed_phases.append({
-                            "action": current_active['action'],
-                            "start_frame": current_active['start'],
-                            "end_frame": i - 1,
-                            "duration": duration
-                        })
-                    
-                    if action:
-                        active_phases[info['name']] = {"action": action, "start": i}
-                    else:
-                        del active_phases[info['name']]
-
     # 3. Save Results
     base_name = os.path.splitext(os.path.basename(json_path))[0].replace("_coords", "")
     output_file = f"{base_name}_actions.json"